@@ -0,0 +1,432 @@
+import os
+import sys
+import time
+import zlib
+import asyncio
+import argparse
+import tempfile
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from aiohttp import ClientSession, web  # noqa: E402
+
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures", "profiles")
+
+# Offline end-to-end benchmark: rematchtracker is replaced by a local server
+# for the saved profile pages, the Discord CDN by an avatar stub, and Discord
+# itself by fake Context/Member/Guild objects handed straight to the command
+# callbacks. Everything below the callback (storage, scraping, rendering)
+# is the real code.
+#
+#   python benchmarks/bench_e2e.py --players 20 --iterations 40 --concurrency 4
+#   python benchmarks/bench_e2e.py --no-browser   # skip Chromium, fetch HTML directly
+
+
+# --- Fake rematchtracker + CDN ---
+
+# Emulates the site's mode dropdown: after a click, four ArrowDowns and Enter
+# select "Ranked", which swaps in the ranked variant of the page.
+DROPDOWN_SCRIPT = """
+<script>
+(() => {
+  const box = document.querySelector('div.gap-4.mb-6 > div[role=listbox]');
+  if (!box) return;
+  let open = false, downs = 0;
+  box.addEventListener('click', () => { open = true; downs = 0; box.focus(); });
+  box.addEventListener('keydown', async (e) => {
+    if (!open) return;
+    if (e.key === 'ArrowDown') downs++;
+    if (e.key !== 'Enter') return;
+    open = false;
+    if (downs % 5 !== 4) return;
+    const resp = await fetch(location.pathname + '?mode=ranked');
+    const doc = new DOMParser().parseFromString(await resp.text(), 'text/html');
+    document.body.innerHTML = doc.body.innerHTML;
+  });
+})();
+</script>
+"""
+
+
+def load_fixtures():
+    fixtures = {}
+    for filename in sorted(os.listdir(FIXTURES_DIR)):
+        if not filename.endswith(".html") or filename.endswith(".ranked.html"):
+            continue
+        slug = filename[:-len(".html")]
+        with open(os.path.join(FIXTURES_DIR, filename), encoding="utf-8") as f:
+            casual = f.read()
+        ranked_path = os.path.join(FIXTURES_DIR, slug + ".ranked.html")
+        ranked = casual
+        if os.path.exists(ranked_path):
+            with open(ranked_path, encoding="utf-8") as f:
+                ranked = f.read()
+        platform, _, player_id = slug.partition("_")
+        fixtures[(platform, player_id)] = (casual.replace("</body>", DROPDOWN_SCRIPT + "</body>"), ranked)
+    return fixtures
+
+
+def make_site(fixtures, site_latency: float):
+    keys = sorted(fixtures)
+    avatar_cache = {}
+
+    async def profile(request):
+        if site_latency:
+            await asyncio.sleep(site_latency)
+        key = (request.match_info["platform"], request.match_info["player_id"])
+        if key not in fixtures:
+            # Unknown players get a stable stand-in so any number can be linked
+            key = keys[zlib.crc32("/".join(key).encode()) % len(keys)]
+        casual, ranked = fixtures[key]
+        body = ranked if request.query.get("mode") == "ranked" else casual
+        return web.Response(text=body, content_type="text/html")
+
+    async def avatar(request):
+        from PIL import Image
+
+        size = int(request.query.get("size", "1024"))
+        data = avatar_cache.get(size)
+        if data is None:
+            buf = BytesIO()
+            Image.new("RGB", (size, size), (80, 140, 220)).save(buf, format="PNG")
+            data = avatar_cache[size] = buf.getvalue()
+        return web.Response(body=data, content_type="image/png")
+
+    app = web.Application()
+    app.router.add_get("/player/{platform}/{player_id}", profile)
+    app.router.add_get("/avatars/{user_id}.png", avatar)
+    return app
+
+
+# --- Fake Discord ---
+
+class FakeAsset:
+    def __init__(self, base: str, size: int = 1024):
+        self.base = base
+        self.size = size
+
+    def with_static_format(self, fmt):
+        return self
+
+    def with_size(self, size):
+        return FakeAsset(self.base, size)
+
+    @property
+    def url(self):
+        return str(self)
+
+    def __str__(self):
+        return f"{self.base}?size={self.size}"
+
+
+class FakeRole:
+    def __init__(self, role_id: int, name: str):
+        self.id = role_id
+        self.name = name
+
+    def is_default(self):
+        return self.name == "@everyone"
+
+
+class FakeGuild:
+    def __init__(self):
+        self.id = 1
+        self.name = "Bench Guild"
+        self.shard_id = 0
+        self.chunked = True
+        self.roles = [FakeRole(1, "@everyone")]
+        self.members = {}
+
+    def get_member(self, user_id: int):
+        return self.members.get(user_id)
+
+    async def create_role(self, name, reason=None):
+        role = FakeRole(len(self.roles) + 1, name)
+        self.roles.append(role)
+        return role
+
+    async def chunk(self):
+        pass
+
+
+class FakeMember:
+    def __init__(self, user_id: int, name: str, guild: FakeGuild, cdn: str):
+        self.id = user_id
+        self.name = name
+        self.nick = None
+        self.display_name = name
+        self.guild = guild
+        self.avatar = FakeAsset(f"{cdn}/avatars/{user_id}.png")
+        self.roles = [guild.roles[0]]
+
+    async def edit(self, roles=None, reason=None):
+        if roles is not None:
+            self.roles = [self.guild.roles[0]] + list(roles)
+
+
+class FakeMessage:
+    def __init__(self, content=None):
+        self.content = content
+
+    async def edit(self, content=None, **kwargs):
+        self.content = content
+
+
+class FakeContext:
+    def __init__(self, author: FakeMember, guild: FakeGuild):
+        self.author = author
+        self.guild = guild
+        self.message = FakeMessage()
+        self.message.attachments = []
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+        for f in [kwargs.get("file")] + list(kwargs.get("files") or []):
+            if f is not None:
+                f.close()
+        return FakeMessage(content)
+
+    @property
+    def failed(self):
+        return any(c and c.startswith(("❌", "⚠️")) for c, _ in self.sent)
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def defer(self, thinking=False, ephemeral=False):
+        self.interaction.mark()
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        self.interaction.mark(content, kwargs.get("file"))
+        return FakeMessage(content)
+
+
+class FakeInteraction:
+    # Records when the interaction was first acknowledged and when the first
+    # card (attachment) was posted, relative to creation
+    def __init__(self, user: FakeMember, guild: FakeGuild):
+        self.user = user
+        self.guild = guild
+        self.created = time.perf_counter()
+        self.first_response = None
+        self.first_card = None
+        self.sent = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    def mark(self, content=None, *files):
+        now = time.perf_counter() - self.created
+        if self.first_response is None:
+            self.first_response = now
+        files = [f for f in files if f is not None]
+        if files and self.first_card is None:
+            self.first_card = now
+        for f in files:
+            f.close()
+        if content is not None or files:
+            self.sent.append((content, {}))
+
+    async def edit_original_response(self, content=None, attachments=(), **kwargs):
+        self.mark(content, *attachments)
+
+    @property
+    def failed(self):
+        # The last edit is what the user ends up seeing
+        return bool(self.sent) and bool(self.sent[-1][0]) and self.sent[-1][0].startswith(("❌", "⚠️"))
+
+
+# --- Harness ---
+
+def _percentile(samples, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run_command(name, invoke, iterations: int, concurrency: int):
+    latencies = []
+    errors = []
+    responses, cards = [], []  # slash commands: first acknowledgement / first card
+    first = []  # the very first invocation, which pays for any cold cache
+    counter = iter(range(iterations))
+
+    async def worker():
+        for i in counter:
+            t0 = time.perf_counter()
+            try:
+                ctx = await invoke(i)
+                if getattr(ctx, "first_response", None) is not None:
+                    responses.append(ctx.first_response)
+                if getattr(ctx, "first_card", None) is not None:
+                    cards.append(ctx.first_card)
+                if ctx.failed:
+                    errors.append(next(c for c, _ in ctx.sent if c))
+            except Exception as e:
+                errors.append(repr(e))
+            latencies.append(time.perf_counter() - t0)
+            if i == 0:
+                first.append(latencies[-1])
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+
+    print(f"{name:<12} {len(latencies):>5} {len(errors):>6} {len(latencies) / elapsed:>9.2f}"
+          f" {first[0] * 1000:>9.1f} {_percentile(latencies, 0.5) * 1000:>9.1f}"
+          f" {_percentile(latencies, 0.95) * 1000:>9.1f} {_percentile(latencies, 0.99) * 1000:>9.1f}")
+    if responses:
+        print(f"{'':<12} first response p50 {_percentile(responses, 0.5) * 1000:.1f} ms"
+              f" p95 {_percentile(responses, 0.95) * 1000:.1f} ms"
+              + (f" · first card p50 {_percentile(cards, 0.5) * 1000:.1f} ms"
+                 f" p95 {_percentile(cards, 0.95) * 1000:.1f} ms" if cards else ""))
+    if errors:
+        print(f"{'':<12} first error: {errors[0]}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end command benchmark")
+    parser.add_argument("--commands", default="rank,stats,rstats,leaderboard,listlinks")
+    parser.add_argument("--players", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--site-latency", type=float, default=0.0, help="seconds of delay per profile page")
+    parser.add_argument("--backend", default="json", choices=("json", "sqlite"))
+    parser.add_argument("--no-browser", action="store_true", help="fetch pages over HTTP instead of Chromium")
+    parser.add_argument("--profile-ttl", type=float, default=0.0,
+                        help="profile cache TTL in seconds; 0 scrapes on every command")
+    parser.add_argument("--snapshot", help="cache snapshot to warm-start from and save to on exit "
+                                           "(run twice to compare a cold and a warm start)")
+    parser.add_argument("--port", type=int, default=0,
+                        help="fixture server port; fix it with --snapshot so avatar URLs match across runs")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    runner = web.AppRunner(make_site(fixtures, args.site_latency))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+
+    from rematch_bot import bot as bot_module, scraper
+    from rematch_bot.snapshot import cache_snapshot
+    from rematch_bot.storage import JSONStorage, SQLiteStorage
+
+    cache_snapshot.path = args.snapshot or ""
+
+    scraper.PROFILE_URL = base + "/player/{platform}/{player_id}"
+    scraper.profile_cache.ttl = args.profile_ttl
+    if args.no_browser:
+        session = ClientSession()
+
+        async def fetch_html(platform, player_id, ranked=False):
+            url = scraper.PROFILE_URL.format(platform=platform, player_id=player_id)
+            async with session.get(url, params={"mode": "ranked"} if ranked else None) as resp:
+                return await resp.text()
+
+        scraper._fetch_html = fetch_html
+
+    tmp = tempfile.mkdtemp(prefix="rematch-bench-")
+    if args.backend == "sqlite":
+        store = SQLiteStorage(os.path.join(tmp, "linked_profiles.db"), legacy_stats_path=None)
+    else:
+        store = JSONStorage(*(os.path.join(tmp, n) for n in ("links.json", "stats.json", "history.json")))
+    await store.init()
+    bot_module.store = store
+
+    guild = FakeGuild()
+    fixture_keys = sorted(fixtures)
+    members = []
+    for i in range(args.players):
+        member = FakeMember(100000000000000000 + i, f"BenchPlayer{i:04d}", guild, base)
+        guild.members[member.id] = member
+        members.append(member)
+        platform, player_id = fixture_keys[i % len(fixture_keys)]
+        await store.replace_link(str(member.id), platform, player_id)
+        await bot_module.update_last_stats(str(member.id), platform, player_id, {
+            "rank": "Gold", "wins": str(i), "losses": "0", "goals": "0", "passes": "0",
+            "steals": "0", "saves": "0", "assists": "0",
+        })
+
+    async def fetch_user(user_id):
+        return guild.members[user_id]
+
+    bot_module.bot.fetch_user = fetch_user
+
+    def member_command(command):
+        async def invoke(i):
+            member = members[i % len(members)]
+            ctx = FakeContext(member, guild)
+            await command.callback(ctx)
+            return ctx
+        return invoke
+
+    def team_command(command, size):
+        # One command for `size` members, as in `!stats @a @b @c`
+        async def invoke(i):
+            team = [members[(i + k) % len(members)] for k in range(size)]
+            ctx = FakeContext(team[0], guild)
+            await command.callback(ctx, *team)
+            return ctx
+        return invoke
+
+    def plain_command(command, *extra):
+        async def invoke(i):
+            ctx = FakeContext(members[i % len(members)], guild)
+            await command.callback(ctx, *extra)
+            return ctx
+        return invoke
+
+    def slash_command(command, *extra):
+        async def invoke(i):
+            interaction = FakeInteraction(members[i % len(members)], guild)
+            await command.callback(interaction, *extra)
+            return interaction
+        return invoke
+
+    invokers = {
+        "rank": member_command(bot_module.rank),
+        "stats": member_command(bot_module.stats),
+        "rstats": member_command(bot_module.rstats),
+        "teamstats": team_command(bot_module.stats, 5),
+        "teamrank": team_command(bot_module.rank, 5),
+        "compare": team_command(bot_module.compare, 4),
+        "leaderboard": plain_command(bot_module.leaderboard, "wins"),
+        "listlinks": plain_command(bot_module.listlinks),
+        "/rank": slash_command(bot_module.rank_slash, None),
+        "/stats": slash_command(bot_module.stats_slash, None),
+        "/rstats": slash_command(bot_module.rstats_slash, None),
+        "/leaderboard": slash_command(bot_module.leaderboard_slash, "wins"),
+    }
+
+    print(f"{args.players} players, {args.iterations} runs per command, concurrency {args.concurrency}"
+          f"{', no browser' if args.no_browser else ''}")
+    print(f"{'command':<12} {'runs':>5} {'errors':>6} {'cmd/s':>9} {'first ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    cwd = os.getcwd()
+    os.chdir(ROOT)  # card generators resolve assets/ relative to the working directory
+    # Same background warm-up the bot does in on_ready
+    await asyncio.get_running_loop().run_in_executor(None, bot_module._warm_up)
+    try:
+        for name in args.commands.split(","):
+            await run_command(name, invokers[name], args.iterations, args.concurrency)
+    finally:
+        os.chdir(cwd)
+        if args.snapshot:
+            bot_module._save_cache_snapshot_sync()
+        await store.close()
+        if args.no_browser:
+            await session.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rematch_bot import analytics  # noqa: E402
+from bench_storage import _fake_entry, _fake_id  # noqa: E402
+
+
+def _timed(fn, *args, repeat: int = 5):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, result
+
+
+async def bench(players: int, guild_size: int):
+    stats = {_fake_id(i): _fake_entry(i, wins=random.randrange(1000)) for i in range(players)}
+    cache = analytics.GuildAnalytics(lambda: asyncio.sleep(0, stats))
+
+    t0 = time.perf_counter()
+    columns = await cache.columns()
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    guild = [int(_fake_id(i)) for i in random.sample(range(players), min(guild_size, players))]
+    summary_all_ms, _ = _timed(analytics.summarize, columns)
+    summary_guild_ms, summary = _timed(analytics.summarize, columns, guild)
+    user_ms, _ = _timed(analytics.user_percentiles, columns, str(guild[0]), guild)
+
+    t0 = time.perf_counter()
+    for i in range(1000):
+        cache.update(_fake_id(random.randrange(players)), _fake_entry(i))
+    update_us = (time.perf_counter() - t0) * 1000
+
+    print(f"{players:>8} players  build {build_ms:>8.1f} ms  summary {summary_all_ms:>6.2f} ms"
+          f"  guild({len(guild)}) {summary_guild_ms:>6.2f} ms"
+          f"  user {user_ms:>6.2f} ms  update {update_us:>5.2f} us")
+    assert summary["players"] == len(guild)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Guild analytics (NumPy columns) benchmark")
+    parser.add_argument("--players", default="1000,10000,100000")
+    parser.add_argument("--guild-size", type=int, default=5000)
+    args = parser.parse_args()
+    for players in (int(p) for p in args.players.split(",")):
+        await bench(players, args.guild_size)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
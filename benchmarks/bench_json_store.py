@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rematch_bot.storage import JSONDB  # noqa: E402
+
+
+def _fake_id(i: int) -> str:
+    return str(100000000000000000 + i)
+
+
+async def bench_size(n: int, ops: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "linked_profiles.json")
+        db = JSONDB(path)
+        await db.load()
+        await db.replace_links([(_fake_id(i), "steam", f"7656{i:013d}") for i in range(n)])
+        await db.compact()
+
+        keys = [_fake_id(random.randrange(n)) for _ in range(ops)]
+
+        t0 = time.perf_counter()
+        for k in keys:
+            await db.get_link(k)
+        read_us = (time.perf_counter() - t0) / ops * 1e6
+
+        # Include the flushes/compactions the writes caused so the figure is amortized
+        t0 = time.perf_counter()
+        for i, k in enumerate(keys):
+            await db.replace_link(k, "psn", f"player{i}")
+        await db.flush()
+        write_us = (time.perf_counter() - t0) / ops * 1e6
+
+        # Crash-recovery check: a fresh instance must see the last write
+        reopened = JSONDB(path)
+        await reopened.load()
+        assert await reopened.get_link(keys[-1]) == ("psn", f"player{ops - 1}")
+
+        return read_us, write_us
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="JSONDB read/write cost per operation at different sizes")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--ops", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'players':>10} {'read us/op':>12} {'write us/op':>12}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        read_us, write_us = await bench_size(n, args.ops)
+        print(f"{n:>10} {read_us:>12.2f} {write_us:>12.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
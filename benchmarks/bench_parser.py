@@ -0,0 +1,149 @@
+import os
+import sys
+import time
+import argparse
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rematch_bot.scraper import STAT_SELECTORS, load_parser, parse_profile  # noqa: E402
+
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures", "profiles")
+
+# Parser regression and throughput benchmark over the saved profile pages
+# (one casual and one ranked page per player).
+#
+# Accuracy: each page is also read by a reference extractor that goes by the
+# visible labels ("Wins", "Passes", ...) rather than the Tailwind/Svelte
+# classes and match indexes parse_profile() depends on. A field the
+# reference finds but parse_profile() returns as "N/A", or reads differently,
+# is a failure and the script exits non-zero. Save a fresh page from
+# rematchtracker into the fixtures to check the selectors against the live
+# site.
+#
+# Throughput: pages/sec of parse_profile() for every BeautifulSoup tree
+# builder that is installed (html.parser always; lxml and html5lib if present).
+#
+#   python benchmarks/bench_parser.py
+#   python benchmarks/bench_parser.py --check-only
+#   python benchmarks/bench_parser.py --fixtures ~/saved-pages --seconds 3
+
+# tree builder -> module it needs
+BACKENDS = {"html.parser": None, "lxml": "lxml", "html5lib": "html5lib"}
+
+LABELS = {
+    "rank": "Rank",
+    "wins": "Wins",
+    "losses": "Losses",
+    "goals": "Goals",
+    "passes": "Passes",
+    "steals": "Steals",
+    "saves": "Saves",
+    "assists": "Assists",
+}
+
+
+def load_pages(directory: str):
+    pages = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".html"):
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                pages.append((filename, f.read()))
+    return pages
+
+
+def reference_fields(html: str) -> dict:
+    # What the page shows, found by label: the element right after the one
+    # whose whole text is the label. Fields whose label is missing are absent.
+    soup = load_parser()(html, "html.parser")
+    fields = {}
+    h1 = soup.find("h1")
+    if h1 is not None and h1.get_text(strip=True):
+        fields["name"] = h1.get_text(strip=True)
+    for field, label in LABELS.items():
+        text = soup.find(string=lambda s, label=label: s.strip() == label)
+        value = text.parent.find_next_sibling() if text is not None else None
+        if value is not None and value.get_text(strip=True):
+            fields[field] = value.get_text(strip=True)
+    return fields
+
+
+def check(pages, features: str) -> list:
+    failures = []
+    for filename, html in pages:
+        expected = reference_fields(html)
+        parsed = parse_profile(html, features)
+        for field, value in expected.items():
+            # "N/A" / "Unknown" for a field on the page, or the wrong element
+            got = parsed.get(field)
+            if got != value:
+                failures.append(f"{filename}: {field} is {got!r} but the page shows {value!r}")
+        missing = [f for f in ("name", *STAT_SELECTORS) if f not in expected]
+        if missing:
+            print(f"  note: {filename} has no {', '.join(missing)} on the page")
+    return failures
+
+
+def throughput(pages, features: str, seconds: float):
+    total_bytes = sum(len(html.encode()) for _, html in pages)
+    per_page = []
+    count = 0
+    t0 = time.perf_counter()
+    while True:
+        for _, html in pages:
+            t = time.perf_counter()
+            parse_profile(html, features)
+            per_page.append(time.perf_counter() - t)
+        count += 1
+        elapsed = time.perf_counter() - t0
+        if elapsed >= seconds:
+            break
+    per_page.sort()
+    return (len(per_page) / elapsed, count * total_bytes / elapsed / 1024 / 1024,
+            per_page[len(per_page) // 2] * 1000, per_page[min(len(per_page) - 1, int(len(per_page) * 0.95))] * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile page parser accuracy and throughput")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="directory of saved profile pages")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="BeautifulSoup tree builders to try")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time per backend for the throughput run")
+    parser.add_argument("--check-only", action="store_true", help="skip the throughput run")
+    args = parser.parse_args()
+
+    pages = load_pages(args.fixtures)
+    if not pages:
+        raise SystemExit(f"No .html pages in {args.fixtures}")
+    size_kb = sum(len(html.encode()) for _, html in pages) / 1024
+    print(f"{len(pages)} pages ({size_kb:.0f} KB) from {args.fixtures}")
+
+    failed = False
+    results = []
+    for features in args.backends.split(","):
+        module = BACKENDS.get(features, features)
+        if module is not None and importlib.util.find_spec(module) is None:
+            print(f"{features:<12} skipped ({module} is not installed)")
+            continue
+        failures = check(pages, features)
+        if failures:
+            failed = True
+            print(f"{features:<12} ❌ {len(failures)} field(s) wrong")
+            for failure in failures:
+                print(f"  {failure}")
+        else:
+            print(f"{features:<12} ✅ all fields match the page")
+        if not args.check_only:
+            results.append((features, *throughput(pages, features, args.seconds)))
+
+    if results:
+        print(f"\n{'backend':<12} {'pages/s':>9} {'MB/s':>7} {'p50 ms':>8} {'p95 ms':>8}")
+        for features, pages_per_s, mb_per_s, p50, p95 in results:
+            print(f"{features:<12} {pages_per_s:>9.1f} {mb_per_s:>7.2f} {p50:>8.2f} {p95:>8.2f}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter each time so nothing is already imported
+PROBE = """
+import sys, time, json
+t0 = time.perf_counter()
+import rematch_bot.bot
+t1 = time.perf_counter()
+heavy = [m for m in ("PIL", "bs4", "playwright") if m in sys.modules]
+from rematch_bot import images, scraper
+t2 = time.perf_counter()
+try:
+    images.warm_up()
+    scraper.warm_up()
+except Exception:
+    pass
+t3 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "warm_up": t3 - t2, "heavy": heavy}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start cost of importing the bot package")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    imports = [r["import"] * 1000 for r in results]
+    warm = [r["warm_up"] * 1000 for r in results]
+    print(f"import rematch_bot.bot  median {statistics.median(imports):7.1f} ms  max {max(imports):7.1f} ms")
+    print(f"background warm-up      median {statistics.median(warm):7.1f} ms  max {max(warm):7.1f} ms")
+    heavy = results[0]["heavy"]
+    print(f"heavy modules loaded at import: {', '.join(heavy) if heavy else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rematch_bot.storage import HISTORY_LIMIT, JSONStorage, SQLiteStorage, Storage, aiosqlite  # noqa: E402
+
+
+def _fake_id(i: int) -> str:
+    return str(100000000000000000 + i)
+
+
+def _fake_entry(i: int, wins: int = 10) -> dict:
+    return {
+        "platform": "steam",
+        "player_id": f"7656{i:013d}",
+        "last_updated": "2025-01-01T00:00:00Z",
+        "rank": random.choice(["Bronze", "Silver", "Gold", "Platinum", "Diamond", "Master", "Elite"]),
+        "wins": str(wins),
+        "losses": str(random.randrange(200)),
+        "goals": str(random.randrange(500)),
+        "passes": str(random.randrange(2000)),
+        "steals": str(random.randrange(300)),
+        "saves": str(random.randrange(300)),
+        "assists": str(random.randrange(300)),
+    }
+
+
+def make_backend(name: str, tmp: str) -> Storage:
+    if name == "sqlite":
+        return SQLiteStorage(os.path.join(tmp, "linked_profiles.db"), legacy_stats_path=None)
+    return JSONStorage(
+        os.path.join(tmp, "linked_profiles.json"),
+        os.path.join(tmp, "last_stats.json"),
+        os.path.join(tmp, "stats_history.json"),
+    )
+
+
+# --- Conformance ---
+# Every backend must behave identically through the Storage interface.
+
+async def check_conformance(name: str):
+    with tempfile.TemporaryDirectory() as tmp:
+        s = make_backend(name, tmp)
+        await s.init()
+
+        assert await s.get_link("1") is None
+        assert await s.delete_link("1") is False
+        await s.replace_link("1", "steam", "a")
+        await s.replace_link("1", "psn", "b")
+        assert await s.get_link("1") == ("psn", "b")
+        await s.replace_links([("2", "steam", "c"), ("3", "xbox", "d")])
+        assert sorted(await s.list_links()) == [("1", "psn", "b"), ("2", "steam", "c"), ("3", "xbox", "d")]
+        batches = [b async for b in s.iter_links(2)]
+        assert [len(b) for b in batches] == [2, 1]
+        assert await s.delete_link("2") is True
+        assert await s.get_link("2") is None
+
+        assert await s.get_stats("1") is None
+        assert await s.update_stats("1", _fake_entry(1, wins=1)) is None
+        previous = await s.update_stats("1", _fake_entry(1, wins=2))
+        assert previous is not None and previous["wins"] == "1"
+        assert (await s.get_stats("1"))["wins"] == "2"
+        assert set(await s.get_all_stats()) == {"1"}
+
+        for w in range(3, HISTORY_LIMIT + 10):
+            await s.update_stats("1", _fake_entry(1, wins=w))
+        history = await s.get_history("1")
+        assert len(history) == HISTORY_LIMIT
+        assert history[0]["wins"] == str(HISTORY_LIMIT + 9)
+        assert [h["wins"] for h in await s.get_history("1", limit=2)] == [str(HISTORY_LIMIT + 9), str(HISTORY_LIMIT + 8)]
+        assert await s.get_history("404") == []
+
+        # Everything must survive a close/reopen
+        await s.close()
+        s = make_backend(name, tmp)
+        await s.init()
+        assert await s.get_link("1") == ("psn", "b")
+        assert await s.get_link("2") is None
+        assert (await s.get_stats("1"))["wins"] == str(HISTORY_LIMIT + 9)
+        assert len(await s.get_history("1")) == HISTORY_LIMIT
+
+        await s.clear_links()
+        assert await s.list_links() == []
+        await s.close()
+
+
+# --- Benchmark ---
+
+def _percentile(samples, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def bench_backend(name: str, players: int, ops: int, concurrency: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        s = make_backend(name, tmp)
+        await s.init()
+        for i in range(0, players, 1000):
+            await s.replace_links([(_fake_id(j), "steam", f"7656{j:013d}") for j in range(i, min(players, i + 1000))])
+        for i in range(players):
+            await s.update_stats(_fake_id(i), _fake_entry(i))
+
+        # Command-shaped mix: mostly link/stat lookups, some stat updates
+        workload = [random.choice(("get_link", "get_link", "get_stats", "update_stats")) for _ in range(ops)]
+        latencies = {op: [] for op in set(workload)}
+        queue = iter(workload)
+
+        async def worker():
+            for op in queue:
+                discord_id = _fake_id(random.randrange(players))
+                t0 = time.perf_counter()
+                if op == "update_stats":
+                    await s.update_stats(discord_id, _fake_entry(0))
+                else:
+                    await getattr(s, op)(discord_id)
+                latencies[op].append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+        t1 = time.perf_counter()
+        await s.get_all_stats()
+        all_stats_ms = (time.perf_counter() - t1) * 1000
+
+        await s.close()
+
+    print(f"{name:>7} {players:>8} {ops / elapsed:>10.0f} ops/s  get_all_stats {all_stats_ms:>8.1f} ms")
+    for op, samples in sorted(latencies.items()):
+        print(f"{'':>17} {op:<13} p50 {_percentile(samples, 0.5) * 1e6:>9.1f} us"
+              f"  p99 {_percentile(samples, 0.99) * 1e6:>9.1f} us")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Storage backend conformance checks and benchmark")
+    parser.add_argument("--backends", default="sqlite,json")
+    parser.add_argument("--players", default="1000,10000,100000")
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--skip-conformance", action="store_true")
+    args = parser.parse_args()
+
+    backends = []
+    for name in args.backends.split(","):
+        if name == "sqlite" and aiosqlite is None:
+            print("sqlite: skipped (aiosqlite not installed)")
+            continue
+        backends.append(name)
+
+    if not args.skip_conformance:
+        for name in backends:
+            await check_conformance(name)
+            print(f"{name}: conformance OK")
+
+    for players in (int(p) for p in args.players.split(",")):
+        for name in backends:
+            await bench_backend(name, players, args.ops, args.concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import argparse
+
+# Taken before discord.py is imported so the startup report covers it
+STARTED_AT = time.perf_counter()
+
+
+def _process_address(address: str, index: int) -> str:
+    # Each bot process needs its own scrape queue endpoint
+    kind, _, rest = address.partition(":")
+    if kind == "tcp":
+        host, _, port = rest.rpartition(":")
+        return f"tcp:{host}:{int(port) + index}"
+    return f"{address}.{index}"
+
+
+def launch_shard_processes(processes: int):
+    from . import config
+    from .storage import create_storage
+    from .supervisor import supervise
+
+    if not isinstance(config.SHARD_COUNT, int):
+        raise SystemExit("--processes needs a numeric SHARD_COUNT")
+    if create_storage().name != "sqlite":
+        raise SystemExit("--processes needs the SQLite storage backend; the JSON store is single-process")
+
+    count = config.SHARD_COUNT
+    per_process = -(-count // processes)
+    specs = []
+    for index, first in enumerate(range(0, count, per_process)):
+        last = min(count, first + per_process) - 1
+        env = {"SHARD_IDS": f"{first}-{last}"}
+        # Slash commands are global; one process publishing them is enough
+        if index > 0:
+            env["SYNC_APP_COMMANDS"] = "0"
+        if config.SCRAPER_ADDRESS:
+            env["SCRAPER_ADDRESS"] = _process_address(config.SCRAPER_ADDRESS, index)
+            print(f"Shards {first}-{last}: scrape queue at {env['SCRAPER_ADDRESS']}")
+        if config.CACHE_SNAPSHOT_PATH:
+            env["CACHE_SNAPSHOT_PATH"] = f"{config.CACHE_SNAPSHOT_PATH}.{index}"
+        specs.append((f"Shards {first}-{last}", [sys.executable, "-m", "rematch_bot"], env))
+    supervise(specs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rematch tracker Discord bot")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="split SHARD_COUNT shards across this many bot processes")
+    args = parser.parse_args()
+
+    token = os.getenv("DISCORD_BOT_TOKEN")
+    if not token:
+        raise SystemExit("DISCORD_BOT_TOKEN is not set")
+
+    if args.processes > 1:
+        launch_shard_processes(args.processes)
+        return
+
+    from . import bot as bot_module
+
+    bot_module.STARTED_AT = STARTED_AT
+    bot_module.bot.run(token)
+
+
+if __name__ == "__main__":
+    main()
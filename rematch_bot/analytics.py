@@ -0,0 +1,159 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .events import rank_tier
+from .ranks import RANK_PRIORITY
+
+# NumPy is imported on first use, like Pillow in images.py, so it stays off
+# the startup path.
+np = None
+
+
+def _require_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except Exception as e:
+            raise RuntimeError("NumPy is required for guild analytics. Install it or disable !guildstats.") from e
+        np = numpy
+    return np
+
+
+# --- Guild analytics ---
+# The cached stats are held as one float column per stat (NaN for "N/A"),
+# built once from the store and patched row by row as update_last_stats
+# writes. Guild aggregates are computed over a member mask in one pass.
+
+STAT_FIELDS = ("wins", "losses", "goals", "passes", "steals", "saves", "assists")
+PER_MATCH_FIELDS = ("goals", "assists", "saves", "passes", "steals")
+PERCENTILES = (25, 50, 75, 90)
+_RANK_NAMES = {tier: name for name, tier in RANK_PRIORITY.items()}
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    digits = "".join(c for c in str(value if value is not None else "") if c.isdigit())
+    return float(digits) if digits else float("nan")
+
+
+class StatColumns:
+    def __init__(self, stats: Dict[str, dict]):
+        _require_numpy()
+        self.ids: List[str] = list(stats)
+        self.index = {discord_id: i for i, discord_id in enumerate(self.ids)}
+        entries = list(stats.values())
+        self.user_ids = np.array([int(d) if d.isdigit() else -1 for d in self.ids], dtype=np.int64)
+        self.values = {
+            field: np.array([_number(e.get(field)) for e in entries], dtype=np.float64)
+            for field in STAT_FIELDS
+        }
+        self.tiers = np.array([rank_tier(e.get("rank")) or 0 for e in entries], dtype=np.int8)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def set_row(self, row: int, entry: dict):
+        for field in STAT_FIELDS:
+            self.values[field][row] = _number(entry.get(field))
+        self.tiers[row] = rank_tier(entry.get("rank")) or 0
+
+    def member_mask(self, member_ids: Optional[Iterable[int]] = None):
+        if member_ids is None:
+            return np.ones(len(self.ids), dtype=bool)
+        return np.isin(self.user_ids, np.fromiter(member_ids, dtype=np.int64))
+
+    def metrics(self, mask) -> Dict[str, "np.ndarray"]:
+        # Per-player derived stats for the masked rows; NaN where unknown
+        wins = self.values["wins"][mask]
+        games = wins + self.values["losses"][mask]
+        played = games > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            metrics = {"win%": np.where(played, wins / games * 100, np.nan)}
+            for field in PER_MATCH_FIELDS:
+                metrics[f"{field}/match"] = np.where(played, self.values[field][mask] / games, np.nan)
+        metrics["wins"] = wins
+        return metrics
+
+
+def summarize(columns: StatColumns, member_ids: Optional[Iterable[int]] = None) -> dict:
+    mask = columns.member_mask(member_ids)
+    summary = {"players": int(mask.sum()), "metrics": {}}
+    for name, values in columns.metrics(mask).items():
+        valid = values[~np.isnan(values)]
+        if valid.size:
+            summary["metrics"][name] = {
+                "mean": float(valid.mean()),
+                "percentiles": dict(zip(PERCENTILES, (float(p) for p in np.percentile(valid, PERCENTILES)))),
+            }
+    counts = np.bincount(columns.tiers[mask], minlength=len(RANK_PRIORITY) + 1)
+    summary["ranks"] = {_RANK_NAMES[t]: int(counts[t]) for t in sorted(_RANK_NAMES) if counts[t]}
+    summary["unranked"] = int(counts[0])
+    return summary
+
+
+def user_percentiles(columns: StatColumns, discord_id: str,
+                     member_ids: Optional[Iterable[int]] = None) -> Optional[Dict[str, float]]:
+    mask = columns.member_mask(member_ids)
+    row = columns.index.get(discord_id)
+    if row is None or not mask[row]:
+        return None
+    position = int(mask[:row].sum())
+    result = {}
+    for name, values in columns.metrics(mask).items():
+        value = values[position]
+        known = values[~np.isnan(values)]
+        if not np.isnan(value) and known.size:
+            result[name] = float((known <= value).sum() / known.size * 100)
+    return result
+
+
+class GuildAnalytics:
+    # Caches the StatColumns; update() patches a row in place and a new
+    # player drops the cache so the next read rebuilds it.
+    def __init__(self, load_stats: Callable[[], Awaitable[Dict[str, dict]]]):
+        self._load_stats = load_stats
+        self._columns: Optional[StatColumns] = None
+        self._lock = asyncio.Lock()
+        self._building = False
+        self._updates_during_build: List[Tuple[str, dict]] = []
+
+    def update(self, discord_id: str, entry: dict):
+        if self._building:
+            self._updates_during_build.append((discord_id, entry))
+        if self._columns is None:
+            return
+        row = self._columns.index.get(discord_id)
+        if row is None:
+            self._columns = None
+        else:
+            self._columns.set_row(row, entry)
+
+    async def columns(self) -> StatColumns:
+        if self._columns is not None:
+            return self._columns
+        async with self._lock:
+            if self._columns is None:
+                self._building = True
+                try:
+                    stats = await self._load_stats()
+                    columns = await asyncio.get_running_loop().run_in_executor(None, StatColumns, stats)
+                    # Writes that landed after the load was read; a player
+                    # the load missed means the next read rebuilds again
+                    complete = True
+                    for discord_id, entry in self._updates_during_build:
+                        row = columns.index.get(discord_id)
+                        if row is None:
+                            complete = False
+                        else:
+                            columns.set_row(row, entry)
+                    if complete:
+                        self._columns = columns
+                finally:
+                    self._building = False
+                    self._updates_during_build.clear()
+                return columns
+            return self._columns
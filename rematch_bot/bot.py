@@ -0,0 +1,1257 @@
+import os
+import re
+import sys
+import csv
+import json
+import math
+import time
+import atexit
+import asyncio
+import tempfile
+from collections import OrderedDict
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+
+from . import analytics, config, images, scraper
+from .browsers import browser_governor
+from .events import StatEvent, diff_stats, next_win_streak, stat_events
+from .images import avatar_url_for, generate_rank_card, generate_rank_stats_card, generate_stats_card
+from .ranks import RANK_PRIORITY
+from .scrape_queue import ScrapeDispatcher
+from .scraper import fetch_profile_same_page, fetch_profile_scraped
+from .snapshot import cache_snapshot, decode_json, encode_json
+from .storage import create_storage
+
+# aiohttp for attachment downloads (always present alongside discord.py)
+try:
+    import aiohttp
+except Exception:
+    aiohttp = None
+
+# Storage backend (SQLite when aiosqlite is installed, JSON otherwise)
+store = create_storage()
+atexit.register(store.close_sync)
+
+
+# --- last_stats cache helpers ---
+
+async def get_all_last_stats() -> dict:
+    return await store.get_all_stats()
+
+
+def _add_win_streak(previous: Optional[dict], entry: dict):
+    entry["win_streak"] = next_win_streak(previous, entry)
+
+
+async def update_last_stats(discord_id: str, platform: str, player_id: str, profile_data: dict):
+    entry = {
+        "platform": platform,
+        "player_id": player_id,
+        "last_updated": datetime.utcnow().isoformat() + "Z",
+        "rank": profile_data.get("rank", "N/A"),
+        "wins": profile_data.get("wins", "N/A"),
+        "losses": profile_data.get("losses", "N/A"),
+        "goals": profile_data.get("goals", "N/A"),
+        "passes": profile_data.get("passes", "N/A"),
+        "steals": profile_data.get("steals", "N/A"),
+        "saves": profile_data.get("saves", "N/A"),
+        "assists": profile_data.get("assists", "N/A"),
+    }
+    previous = await store.update_stats(discord_id, entry, _add_win_streak)
+    guild_analytics.update(discord_id, entry)
+    for event in diff_stats(discord_id, previous, entry):
+        stat_events.publish(event)
+
+
+# Column cache behind !guildstats, patched on every stats write
+guild_analytics = analytics.GuildAnalytics(get_all_last_stats)
+
+
+# --- Discord bot setup ---
+intents = discord.Intents.default()
+intents.message_content = True
+intents.members = True
+if config.SHARD_COUNT or config.SHARD_IDS:
+    bot = commands.AutoShardedBot(
+        command_prefix=config.COMMAND_PREFIX,
+        intents=intents,
+        shard_count=None if config.SHARD_COUNT == "auto" else config.SHARD_COUNT,
+        shard_ids=config.SHARD_IDS,
+        chunk_guilds_at_startup=config.CHUNK_GUILDS_AT_STARTUP,
+    )
+else:
+    bot = commands.Bot(
+        command_prefix=config.COMMAND_PREFIX,
+        intents=intents,
+        chunk_guilds_at_startup=config.CHUNK_GUILDS_AT_STARTUP,
+    )
+
+
+# Scraping runs in separate worker processes when SCRAPER_ADDRESS is set
+# (e.g. unix:/tmp/rematch-scraper.sock); otherwise in this process.
+scrape_dispatcher: Optional[ScrapeDispatcher] = None
+
+
+@bot.event
+async def setup_hook():
+    global scrape_dispatcher
+    # Before login, so no command or event can reach the store unopened
+    await store.init()
+    # Registered here rather than at import so only a running bot writes it
+    if config.CACHE_SNAPSHOT_PATH:
+        atexit.register(_save_cache_snapshot_sync)
+    if config.SCRAPER_ADDRESS:
+        scrape_dispatcher = ScrapeDispatcher(config.SCRAPER_ADDRESS)
+        await scrape_dispatcher.start()
+        scraper.set_dispatcher(scrape_dispatcher)
+    if config.SYNC_APP_COMMANDS:
+        try:
+            synced = await bot.tree.sync()
+            print(f"Synced {len(synced)} slash commands")
+        except Exception as e:
+            print(f"⚠️ Could not sync slash commands: {e}")
+
+
+# Set by the entry point; used to report how long startup took
+STARTED_AT: Optional[float] = None
+_warmed_up = False
+
+
+def _warm_up():
+    images.warm_up()
+    scraper.warm_up(playwright=scrape_dispatcher is None)
+
+
+@bot.event
+async def on_connect():
+    if STARTED_AT is not None:
+        print(f"Connected to gateway in {time.perf_counter() - STARTED_AT:.2f}s")
+
+
+@bot.event
+async def on_ready():
+    global _warmed_up
+    if not rank_role_sync.is_running():
+        rank_role_sync.start()
+    if _announce_queue is not None and not announce_stat_events.is_running():
+        announce_stat_events.start()
+    if config.CACHE_SNAPSHOT_PATH and not save_cache_snapshot.is_running():
+        save_cache_snapshot.start()
+    if not _warmed_up:
+        # Heavy imports (Pillow, bs4, Playwright) load in a worker thread
+        _warmed_up = True
+        asyncio.get_running_loop().run_in_executor(None, _warm_up)
+    if STARTED_AT is not None:
+        print(f"Logged in as {bot.user} (ready in {time.perf_counter() - STARTED_AT:.2f}s)")
+    else:
+        print(f"Logged in as {bot.user}")
+
+
+# --- Cache snapshot ---
+# Profiles, resolved users, avatars and leaderboard tiles are saved
+# periodically (encoding runs in a worker thread) and once more at exit.
+
+def _save_cache_snapshot_sync():
+    try:
+        cache_snapshot.save()
+    except Exception as e:
+        print(f"⚠️ Could not save cache snapshot: {e}", file=sys.stderr)
+
+
+@tasks.loop(minutes=config.CACHE_SNAPSHOT_MINUTES)
+async def save_cache_snapshot():
+    # The first iteration runs at startup, when there is nothing new to save
+    if save_cache_snapshot.current_loop == 0:
+        return
+    try:
+        collected = cache_snapshot.collect()
+        t0 = time.perf_counter()
+        count = await asyncio.get_running_loop().run_in_executor(None, cache_snapshot.write_collected, collected)
+        print(f"Cache snapshot: {count} records saved in {(time.perf_counter() - t0) * 1000:.0f} ms", file=sys.stderr)
+    except Exception as e:
+        print(f"⚠️ Could not save cache snapshot: {e}", file=sys.stderr)
+
+
+# --- Commands: linking / admin management ---
+# Links are stored straight away; a background scrape then checks the
+# profile exists (warming the profile cache and last_stats) and reports
+# back in the channel if it doesn't.
+_background_tasks = set()
+
+
+def _spawn(coro):
+    task = asyncio.get_running_loop().create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def _validate_link(ctx, discord_id: str, platform: str, player_id: str):
+    try:
+        profile_data, scraped = await fetch_profile_scraped(platform, player_id)
+    except scraper.ProfileNotFoundError:
+        await ctx.send(f"⚠️ No rematchtracker profile found at `{platform}/{player_id}`. "
+                       f"Check the link and run `!link` again.")
+        return
+    except Exception as e:
+        # Site trouble isn't the user's fault; the link stands
+        print(f"Link validation for {platform}/{player_id} skipped: {e}")
+        return
+    if scraped:
+        await update_last_stats(discord_id, platform, player_id, profile_data)
+
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def forcelink(ctx, member: discord.Member, profile_url: str):
+    try:
+        platform, user_id = scraper.parse_profile_url(profile_url)
+    except ValueError as e:
+        await ctx.send(f"❌ Invalid profile URL: {e}")
+        return
+    try:
+        discord_id = str(member.id)
+        await store.replace_link(discord_id, platform, user_id)
+        await ctx.send(f"✅ Linked `{member.display_name}` to `{platform}/{user_id}`.")
+        _spawn(_validate_link(ctx, discord_id, platform, user_id))
+    except Exception as e:
+        await ctx.send(f"❌ Error force-linking profile: {e}")
+
+
+@bot.command()
+async def link(ctx, profile_url: str):
+    try:
+        platform, user_id = scraper.parse_profile_url(profile_url)
+    except ValueError as e:
+        await ctx.send(f"❌ Invalid profile URL: {e}")
+        return
+    try:
+        discord_id = str(ctx.author.id)
+        await store.replace_link(discord_id, platform, user_id)
+        await ctx.send(f"✅ Linked to `{platform}/{user_id}`.")
+        _spawn(_validate_link(ctx, discord_id, platform, user_id))
+    except Exception as e:
+        await ctx.send(f"❌ Error linking profile: {e}")
+
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def cleardb(ctx):
+    try:
+        await store.clear_links()
+        await ctx.send("🧨 All linked profiles have been cleared from the database.")
+    except Exception as e:
+        await ctx.send(f"❌ Error clearing the database: {e}")
+
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def unlink(ctx, member: discord.Member):
+    try:
+        discord_id = str(member.id)
+        await store.delete_link(discord_id)
+        await ctx.send(f"🗑️ Unlinked profile for {member.display_name}.")
+    except Exception as e:
+        await ctx.send(f"❌ Error unlinking profile: {e}")
+
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def listlinks(ctx):
+    try:
+        rows = await store.list_links()
+        if not rows:
+            await ctx.send("❌ No linked profiles found.")
+            return
+
+        lines = []
+        for discord_id, platform, player_id in rows:
+            try:
+                member = ctx.guild.get_member(int(discord_id)) if ctx.guild else None
+                if member:
+                    name = member.nick if member.nick else member.name
+                else:
+                    user = await bot.fetch_user(int(discord_id))
+                    name = user.name
+            except Exception:
+                name = f"UnknownUser ({discord_id})"
+
+            lines.append(f"**{name}** → `{platform}/{player_id}`")
+
+        description = "\n".join(lines)
+        embed = discord.Embed(title="🔗 Linked Accounts", description=description, color=discord.Color.blue())
+        await ctx.send(embed=embed)
+    except Exception as e:
+        await ctx.send(f"⚠️ Error listing links: {e}")
+
+
+# --- Bulk import / export of linked profiles ---
+IMPORT_BATCH_SIZE = 1000
+IMPORT_PROGRESS_INTERVAL = 2.0
+LINK_FIELDS = ("discord_id", "platform", "player_id")
+_DISCORD_ID_RE = re.compile(r"^\d{15,21}$")
+
+
+def _validate_link_row(discord_id, platform, player_id) -> Tuple[str, str, str]:
+    discord_id = str(discord_id or "").strip()
+    if not _DISCORD_ID_RE.match(discord_id):
+        raise ValueError(f"invalid discord_id {discord_id!r}")
+    platform, player_id = scraper.validate_profile_ref(str(platform or ""), str(player_id or ""))
+    return discord_id, platform, player_id
+
+
+def _iter_import_file(path: str, fmt: str):
+    # Yields (line_no, row_or_None, error_or_None) one line at a time
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            reader = csv.reader(f)
+            for line_no, fields in enumerate(reader, start=1):
+                if not fields or (line_no == 1 and tuple(x.strip() for x in fields) == LINK_FIELDS):
+                    continue
+                try:
+                    if len(fields) != 3:
+                        raise ValueError(f"expected 3 columns, got {len(fields)}")
+                    yield line_no, _validate_link_row(*fields), None
+                except ValueError as e:
+                    yield line_no, None, str(e)
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    obj = json.loads(line)
+                    if not isinstance(obj, dict):
+                        raise ValueError("expected a JSON object")
+                    yield line_no, _validate_link_row(*(obj.get(k) for k in LINK_FIELDS)), None
+                except ValueError as e:
+                    yield line_no, None, str(e)
+
+
+def _format_export_rows(rows: List[Tuple[str, str, str]], fmt: str) -> str:
+    if fmt == "csv":
+        from io import StringIO
+        buf = StringIO()
+        csv.writer(buf).writerows(rows)
+        return buf.getvalue()
+    return "".join(json.dumps(dict(zip(LINK_FIELDS, r))) + "\n" for r in rows)
+
+
+def _append_text(path: str, text: str):
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def exportlinks(ctx, fmt: str = "csv"):
+    fmt = fmt.lower()
+    if fmt not in ("csv", "ndjson"):
+        await ctx.send("Valid export formats: csv, ndjson")
+        return
+
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        loop = asyncio.get_running_loop()
+        total = 0
+        if fmt == "csv":
+            await loop.run_in_executor(None, _append_text, path, _format_export_rows([LINK_FIELDS], fmt))
+        async for rows in store.iter_links(IMPORT_BATCH_SIZE):
+            await loop.run_in_executor(None, _append_text, path, _format_export_rows(rows, fmt))
+            total += len(rows)
+
+        await ctx.send(
+            f"📤 Exported {total} linked profiles.",
+            file=discord.File(path, filename=f"linked_profiles.{fmt}"),
+        )
+    except Exception as e:
+        await ctx.send(f"❌ Error exporting links: {e}")
+    finally:
+        try:
+            os.remove(path)
+        except Exception:
+            pass
+
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def importlinks(ctx):
+    if not ctx.message.attachments:
+        await ctx.send("❌ Attach a `.csv` (discord_id,platform,player_id) or `.ndjson` file to import.")
+        return
+    if aiohttp is None:
+        await ctx.send("❌ aiohttp is required for importing links.")
+        return
+
+    attachment = ctx.message.attachments[0]
+    filename = attachment.filename.lower()
+    if filename.endswith(".csv"):
+        fmt = "csv"
+    elif filename.endswith((".ndjson", ".jsonl")):
+        fmt = "ndjson"
+    else:
+        await ctx.send("❌ Unsupported file type. Use `.csv` or `.ndjson`.")
+        return
+
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        # Stream the attachment to disk so large files never sit in memory
+        async with aiohttp.ClientSession() as session:
+            async with session.get(attachment.url) as resp:
+                resp.raise_for_status()
+                with open(path, "wb") as f:
+                    async for chunk in resp.content.iter_chunked(64 * 1024):
+                        f.write(chunk)
+
+        status = await ctx.send(f"📥 Importing `{attachment.filename}`...")
+        loop = asyncio.get_running_loop()
+        rows_iter = _iter_import_file(path, fmt)
+        imported = 0
+        errors: List[str] = []
+        error_count = 0
+        last_progress = loop.time()
+
+        while True:
+            chunk = await loop.run_in_executor(None, lambda: list(islice(rows_iter, IMPORT_BATCH_SIZE)))
+            if not chunk:
+                break
+            batch = []
+            for line_no, row, error in chunk:
+                if error:
+                    error_count += 1
+                    if len(errors) < 10:
+                        errors.append(f"line {line_no}: {error}")
+                else:
+                    batch.append(row)
+            if batch:
+                await store.replace_links(batch)
+                imported += len(batch)
+
+            if loop.time() - last_progress >= IMPORT_PROGRESS_INTERVAL:
+                last_progress = loop.time()
+                try:
+                    await status.edit(content=f"📥 Importing `{attachment.filename}`... {imported} imported, {error_count} skipped")
+                except Exception:
+                    pass
+
+        summary = f"✅ Imported {imported} linked profiles from `{attachment.filename}`."
+        if error_count:
+            summary += f"\n⚠️ Skipped {error_count} invalid rows:\n" + "\n".join(f"`{e}`" for e in errors)
+            if error_count > len(errors):
+                summary += f"\n...and {error_count - len(errors)} more."
+        await status.edit(content=summary)
+    except Exception as e:
+        await ctx.send(f"❌ Error importing links: {e}")
+    finally:
+        try:
+            os.remove(path)
+        except Exception:
+            pass
+
+
+# --- Shard metrics ---
+# Messages seen per shard over a sliding window, plus gateway events overall
+# (socket events don't carry a shard id). Counters live in this process only,
+# so each shard-range process reports on its own shards.
+EVENT_WINDOW_SECONDS = 60
+
+
+class EventRate:
+    def __init__(self, window: int = EVENT_WINDOW_SECONDS):
+        self.window = window
+        self._buckets: Dict[int, int] = {}
+
+    def record(self, n: int = 1):
+        now = int(time.monotonic())
+        self._buckets[now] = self._buckets.get(now, 0) + n
+        if len(self._buckets) > self.window * 2:
+            cutoff = now - self.window
+            for second in [s for s in self._buckets if s <= cutoff]:
+                del self._buckets[second]
+
+    def per_second(self) -> float:
+        cutoff = int(time.monotonic()) - self.window
+        return sum(n for s, n in self._buckets.items() if s > cutoff) / self.window
+
+
+shard_message_rates: Dict[int, EventRate] = {}
+gateway_event_rate = EventRate()
+
+
+@bot.listen("on_socket_event_type")
+async def _count_gateway_event(event_type):
+    gateway_event_rate.record()
+
+
+@bot.listen("on_message")
+async def _count_shard_message(message):
+    shard_id = message.guild.shard_id if message.guild else 0
+    rate = shard_message_rates.get(shard_id)
+    if rate is None:
+        rate = shard_message_rates[shard_id] = EventRate()
+    rate.record()
+
+
+def shard_latencies() -> List[Tuple[int, float]]:
+    if isinstance(bot, commands.AutoShardedBot):
+        return bot.latencies
+    return [(0, bot.latency)]
+
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def shardstats(ctx):
+    try:
+        guild_counts: Dict[int, int] = {}
+        for guild in bot.guilds:
+            guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+
+        lines = []
+        for shard_id, latency in shard_latencies():
+            rate = shard_message_rates.get(shard_id)
+            latency_ms = "n/a" if math.isnan(latency) else f"{latency * 1000:.0f} ms"
+            lines.append(
+                f"**Shard {shard_id}** · {latency_ms} · {guild_counts.get(shard_id, 0)} guilds · "
+                f"{rate.per_second() if rate else 0.0:.2f} msg/s"
+            )
+        lines.append(f"Gateway events (this process): {gateway_event_rate.per_second():.2f}/s")
+
+        embed = discord.Embed(title="📡 Shard Stats", description="\n".join(lines), color=discord.Color.blue())
+        await ctx.send(embed=embed)
+    except Exception as e:
+        await ctx.send(f"❌ Error reading shard stats: {e}")
+
+
+# --- Browser metrics ---
+# Chromium count and memory from this process's browser governor, or with
+# scraper workers, as last reported by each worker process.
+
+def _format_browser_metrics(label: str, metrics: dict) -> str:
+    return (
+        f"**{label}** · {metrics['live']} live · {metrics['rss_mb']:.0f} MB · "
+        f"{metrics['launched']} launched · killed {metrics['killed_time']} (time) / "
+        f"{metrics['killed_memory']} (memory) · {metrics['reaped']} reaped"
+    )
+
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def browserstats(ctx):
+    try:
+        if scrape_dispatcher is None:
+            lines = [_format_browser_metrics("This process", browser_governor.metrics())]
+        else:
+            workers = scrape_dispatcher.worker_browsers()
+            lines = [_format_browser_metrics(f"Worker {pid}", metrics) for pid, metrics in sorted(workers.items())]
+            if workers:
+                lines.append(f"Total: {sum(m['live'] for m in workers.values())} live · "
+                             f"{sum(m['rss_mb'] for m in workers.values()):.0f} MB")
+            else:
+                lines.append("No scraper worker has reported yet.")
+        lines.append(f"Limits: {config.BROWSER_MAX_SECONDS:.0f}s · {config.BROWSER_MAX_RSS_MB:.0f} MB per browser")
+
+        embed = discord.Embed(title="🧭 Browser Stats", description="\n".join(lines), color=discord.Color.blue())
+        await ctx.send(embed=embed)
+    except Exception as e:
+        await ctx.send(f"❌ Error reading browser stats: {e}")
+
+
+# --- Rank role sync ---
+# A member holds at most one rank role, named after their cached rank
+# (e.g. "Diamond" or "Diamond 2"). Changes are applied with a single
+# member.edit(roles=...) call per member, and only when something differs.
+ROLE_EDIT_DELAY = 0.5
+
+# guild_id -> {role name: role}; dropped whenever the guild's roles change
+_role_cache: Dict[int, Dict[str, discord.Role]] = {}
+
+
+def _guild_roles(guild: discord.Guild) -> Dict[str, discord.Role]:
+    roles = _role_cache.get(guild.id)
+    if roles is None:
+        roles = _role_cache[guild.id] = {r.name: r for r in guild.roles}
+    return roles
+
+
+# Exactly a rank name, optionally with a division ("Diamond", "Diamond 2",
+# "Gold III"); roles like "Gold Member" are left alone
+_RANK_ROLE_RE = re.compile(rf"^({'|'.join(RANK_PRIORITY)})( [IV]+| \d)?$", re.IGNORECASE)
+
+
+def _is_rank_role(role: discord.Role) -> bool:
+    return _RANK_ROLE_RE.match(role.name) is not None
+
+
+@bot.event
+async def on_guild_role_create(role):
+    _role_cache.pop(role.guild.id, None)
+
+
+@bot.event
+async def on_guild_role_delete(role):
+    _role_cache.pop(role.guild.id, None)
+
+
+@bot.event
+async def on_guild_role_update(before, after):
+    _role_cache.pop(after.guild.id, None)
+
+
+# (guild_id, role name) -> lock, so members synced together (a batch !rank,
+# the periodic sync) don't each create the same missing role
+_role_create_locks: Dict[Tuple[int, str], asyncio.Lock] = {}
+
+
+async def _get_or_create_rank_role(guild: discord.Guild, name: str) -> discord.Role:
+    role = _guild_roles(guild).get(name)
+    if role is not None:
+        return role
+    lock = _role_create_locks.setdefault((guild.id, name), asyncio.Lock())
+    async with lock:
+        role = _guild_roles(guild).get(name)
+        if role is None:
+            role = await guild.create_role(name=name, reason="Rank role sync")
+            _guild_roles(guild)[name] = role
+    return role
+
+
+async def sync_member_rank_role(member: discord.Member, rank_name: str) -> bool:
+    # Returns True when the member's roles were edited
+    if not rank_name or rank_name == "N/A":
+        return False
+    current = [r for r in member.roles if _is_rank_role(r)]
+    # Ranks without a role of their own (e.g. "Unranked") just clear it
+    has_role = _RANK_ROLE_RE.match(rank_name) is not None
+    if [r.name for r in current] == ([rank_name] if has_role else []):
+        return False
+
+    roles = [r for r in member.roles if not r.is_default() and not _is_rank_role(r)]
+    if has_role:
+        roles.append(await _get_or_create_rank_role(member.guild, rank_name))
+    await member.edit(roles=roles, reason="Rank role sync")
+    return True
+
+
+async def sync_guild_rank_roles(guild: discord.Guild, stats: Optional[dict] = None) -> int:
+    if stats is None:
+        stats = await store.get_all_stats()
+    if not guild.chunked:
+        # Members aren't fetched at login when CHUNK_GUILDS_AT_STARTUP is off
+        await guild.chunk()
+    edits = 0
+    for discord_id, entry in stats.items():
+        try:
+            member = guild.get_member(int(discord_id))
+        except ValueError:
+            continue
+        if member is None:
+            continue
+        if await sync_member_rank_role(member, entry.get("rank", "N/A")):
+            edits += 1
+            # discord.py retries 429s, but spacing edits keeps us out of them
+            await asyncio.sleep(ROLE_EDIT_DELAY)
+    return edits
+
+
+@tasks.loop(minutes=config.ROLE_SYNC_MINUTES)
+async def rank_role_sync():
+    stats = await store.get_all_stats()
+    for guild in bot.guilds:
+        try:
+            edits = await sync_guild_rank_roles(guild, stats)
+            if edits:
+                print(f"Rank role sync: {edits} member(s) updated in {guild.name}")
+        except discord.Forbidden:
+            print(f"Rank role sync: missing permissions in {guild.name}")
+        except Exception as e:
+            print(f"Rank role sync failed in {guild.name}: {e}")
+
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def syncroles(ctx):
+    try:
+        edits = await sync_guild_rank_roles(ctx.guild)
+        await ctx.send(f"🔄 Rank roles synced: {edits} member(s) updated.")
+    except discord.Forbidden:
+        await ctx.send("⚠️ Missing permissions to change roles.")
+    except Exception as e:
+        await ctx.send(f"❌ Error syncing rank roles: {e}")
+
+
+# --- Rank / milestone announcements ---
+# Stat events collected over ANNOUNCE_INTERVAL_SECONDS are posted as one
+# message per guild, to the ANNOUNCE_CHANNEL text channel if the guild has one.
+ANNOUNCE_MAX_LINES = 20
+
+_announce_queue: Optional[asyncio.Queue] = stat_events.subscribe() if config.ANNOUNCE_CHANNEL else None
+
+
+def _format_stat_event(event: StatEvent, member: discord.Member) -> str:
+    if event.kind == "rank_up":
+        return f"🔼 {member.mention} climbed to **{event.new}** (from {event.old})"
+    if event.kind == "rank_down":
+        return f"🔽 {member.mention} dropped to **{event.new}** (from {event.old})"
+    if event.kind == "win_milestone":
+        return f"🏆 {member.mention} reached **{event.new}** wins"
+    return f"🔥 {member.mention} is on a **{event.new}** win streak"
+
+
+@tasks.loop(seconds=config.ANNOUNCE_INTERVAL_SECONDS)
+async def announce_stat_events():
+    pending: List[StatEvent] = []
+    while True:
+        try:
+            pending.append(_announce_queue.get_nowait())
+        except asyncio.QueueEmpty:
+            break
+    if not pending:
+        return
+
+    for guild in bot.guilds:
+        channel = discord.utils.get(guild.text_channels, name=config.ANNOUNCE_CHANNEL)
+        if channel is None:
+            continue
+        lines = []
+        for event in pending:
+            member = guild.get_member(int(event.discord_id))
+            if member is not None:
+                lines.append(_format_stat_event(event, member))
+        if not lines:
+            continue
+        if len(lines) > ANNOUNCE_MAX_LINES:
+            lines = lines[:ANNOUNCE_MAX_LINES] + [f"...and {len(lines) - ANNOUNCE_MAX_LINES} more."]
+        try:
+            await channel.send("\n".join(lines), allowed_mentions=discord.AllowedMentions.none())
+        except discord.Forbidden:
+            print(f"Announcements: missing permissions in {guild.name}")
+        except Exception as e:
+            print(f"Announcements failed in {guild.name}: {e}")
+
+
+# --- Commands: rank/stats/rstats that scrape and update last_stats ---
+# When rematchtracker is down (or its circuit breaker is open) the commands
+# render the last known profile instead and say how old it is.
+
+def _stale_note(profile_data: dict) -> Optional[str]:
+    if "stale_as_of" not in profile_data:
+        return None
+    if profile_data["stale_as_of"] is None:
+        return "⚠️ rematchtracker is unavailable; showing the last saved stats."
+    return f"⚠️ rematchtracker is unavailable; showing stats as of <t:{int(profile_data['stale_as_of'])}:R>."
+
+
+def _entry_timestamp(entry: dict) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(entry["last_updated"].rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+    except Exception:
+        return None
+
+
+async def _stored_profile(discord_id: str, platform: str, player_id: str) -> Optional[dict]:
+    # The stats stored by the last successful command, marked stale
+    entry = await store.get_stats(discord_id)
+    if not entry or (entry.get("platform"), entry.get("player_id")) != (platform, player_id):
+        return None
+    return scraper.stale_profile(entry, _entry_timestamp(entry))
+
+
+async def _fetch_casual_profile(discord_id: str, platform: str, player_id: str) -> Tuple[dict, bool]:
+    # (profile, scraped), as fetch_profile_scraped
+    try:
+        return await fetch_profile_scraped(platform, player_id)
+    except Exception:
+        # Nothing usable in the profile cache (e.g. right after a restart);
+        # fall back to the stats stored by the last successful command
+        stored = await _stored_profile(discord_id, platform, player_id)
+        if stored is None:
+            raise
+        return stored, False
+
+
+# --- Batch lookups ---
+# stats, rank and compare take several members. Links and profiles are
+# fetched concurrently (so they share the profile cache and the scrape
+# queue's single-flight), cards are rendered concurrently and everything
+# goes out as one message.
+MAX_BATCH_MEMBERS = 10  # Discord's attachment limit per message
+NOT_LINKED = "❌ You haven't linked a profile yet. Use `!link <REMATCH TRACKER (not U.gg) profile URL>` first."
+
+
+def _batch_targets(ctx, members) -> list:
+    targets = list({m.id: m for m in members}.values())
+    return targets or [ctx.author]
+
+
+async def _load_member_profile(member) -> Optional[dict]:
+    discord_id = str(member.id)
+    row = await store.get_link(discord_id)
+    if row is None:
+        return None
+
+    platform, player_id = row
+    profile_data, scraped = await _fetch_casual_profile(discord_id, platform, player_id)
+
+    # Update cached last_stats; a profile served from the cache already was
+    if scraped:
+        await update_last_stats(discord_id, platform, player_id, profile_data)
+    return profile_data
+
+
+async def _load_member_profiles(ctx, targets: list) -> Optional[list]:
+    # (member, profile_data) for every target that loaded. With a single
+    # target its errors are raised as before; with several they are listed
+    # in the reply next to the cards of everyone else.
+    if len(targets) > MAX_BATCH_MEMBERS:
+        await ctx.send(f"❌ At most {MAX_BATCH_MEMBERS} members at a time.")
+        return None
+    results = await asyncio.gather(*(_load_member_profile(m) for m in targets), return_exceptions=True)
+    if len(targets) == 1:
+        if results[0] is None:
+            await ctx.send(NOT_LINKED)
+            return None
+        if isinstance(results[0], BaseException):
+            raise results[0]
+
+    loaded, problems = [], []
+    for member, result in zip(targets, results):
+        if result is None:
+            problems.append(f"⚠️ {member.display_name} hasn't linked a profile.")
+        elif isinstance(result, BaseException):
+            problems.append(f"❌ {member.display_name}: {result}")
+        else:
+            loaded.append((member, result))
+    if problems:
+        await ctx.send("\n".join(problems), allowed_mentions=discord.AllowedMentions.none())
+    return loaded
+
+
+def _batch_content(loaded: list) -> Optional[str]:
+    if len(loaded) == 1:
+        return _stale_note(loaded[0][1])
+    notes = [f"{note} ({member.display_name})" for member, profile_data in loaded
+             if (note := _stale_note(profile_data)) is not None]
+    return "\n".join(notes) or None
+
+
+async def _send_cards(ctx, content: Optional[str], cards: list, filename: str):
+    cards = [card for card in cards if card]
+    if not cards:
+        return
+    stem, ext = os.path.splitext(filename)
+    names = [filename] if len(cards) == 1 else [f"{stem}_{i + 1}{ext}" for i in range(len(cards))]
+    files = [discord.File(card, filename=name) for card, name in zip(cards, names)]
+    await ctx.send(content, files=files, allowed_mentions=discord.AllowedMentions.none())
+
+
+@bot.command(ignore_extra=False)
+async def rank(ctx, *members: discord.Member):
+    try:
+        loaded = await _load_member_profiles(ctx, _batch_targets(ctx, members))
+        if not loaded:
+            return
+
+        if ctx.guild:
+            results = await asyncio.gather(
+                *(sync_member_rank_role(member, profile_data.get('rank', 'N/A')) for member, profile_data in loaded),
+                return_exceptions=True,
+            )
+            if any(isinstance(r, discord.Forbidden) for r in results):
+                await ctx.send("⚠️ Missing permissions to change roles.")
+
+        cards = await asyncio.gather(*(
+            generate_rank_card(member.display_name, profile_data.get('rank', 'N/A'), avatar_url_for(member, 96))
+            for member, profile_data in loaded
+        ))
+        await _send_cards(ctx, _batch_content(loaded), cards, "rank.png")
+    except Exception as e:
+        await ctx.send(f"❌ Error fetching rank: {e}")
+
+
+@bot.command(ignore_extra=False)
+async def stats(ctx, *members: discord.Member):
+    try:
+        loaded = await _load_member_profiles(ctx, _batch_targets(ctx, members))
+        if not loaded:
+            return
+
+        cards = await asyncio.gather(*(
+            generate_stats_card(member.display_name, profile_data, avatar_url_for(member, 128))
+            for member, profile_data in loaded
+        ))
+        await _send_cards(ctx, _batch_content(loaded), cards, "stats.png")
+    except Exception as e:
+        await ctx.send(f"❌ Error fetching stats: {e}")
+
+
+@bot.command(ignore_extra=False)
+async def compare(ctx, *members: discord.Member):
+    # !compare @a @b ... ; with one member, compares them with the author
+    try:
+        targets = _batch_targets(ctx, members)
+        if len(targets) == 1 and targets[0].id != ctx.author.id:
+            targets.insert(0, ctx.author)
+        if len(targets) < 2:
+            await ctx.send("❌ Usage: `!compare @member [@member ...]`")
+            return
+        if len(targets) > images.COMPARE_MAX_PLAYERS:
+            await ctx.send(f"❌ At most {images.COMPARE_MAX_PLAYERS} members can be compared at once.")
+            return
+
+        loaded = await _load_member_profiles(ctx, targets)
+        if not loaded or len(loaded) < 2:
+            if loaded is not None:
+                await ctx.send("❌ Need at least two linked members to compare.")
+            return
+
+        image = await images.render_compare_card(
+            [(member.display_name, profile_data, avatar_url_for(member, 72)) for member, profile_data in loaded]
+        )
+        await ctx.send(_batch_content(loaded), file=discord.File(image, filename="compare.png"),
+                       allowed_mentions=discord.AllowedMentions.none())
+    except Exception as e:
+        await ctx.send(f"❌ Error comparing stats: {e}")
+
+
+@bot.command()
+async def rstats(ctx, member: discord.Member = None):
+    try:
+        discord_id = str(member.id if member else ctx.author.id)
+
+        row = await store.get_link(discord_id)
+        if row is None:
+            await ctx.send(NOT_LINKED)
+            return
+
+        platform, player_id = row
+        profile_data = await fetch_profile_same_page(platform, player_id)
+
+        # Update cached last_stats
+        #await update_last_stats(discord_id, platform, player_id, profile_data)
+
+        target_name = member.display_name if member else ctx.author.display_name
+        avatar_url = avatar_url_for(member or ctx.author, 128)
+        image = await generate_rank_stats_card(target_name, profile_data, avatar_url)
+        if image:
+            file = discord.File(image, filename="rank_stats.png")
+            await ctx.send(_stale_note(profile_data), file=file)
+    except Exception as e:
+        await ctx.send(f"❌ Error fetching ranked stats: {e}")
+
+
+# --- Leaderboard ---
+# Members and users discord.py already knows cost no API call. Anyone else
+# is fetched once and remembered (name and 40px avatar URL) for
+# USER_CACHE_TTL, across restarts via the cache snapshot.
+USER_CACHE_TTL = 24 * 3600
+USER_CACHE_MAX = 10000
+_resolved_users: "OrderedDict[int, Tuple[str, Optional[str], float]]" = OrderedDict()
+
+
+def _export_users():
+    for user_id, (name, avatar_url, resolved_at) in reversed(list(_resolved_users.items())):
+        yield user_id, {"t": resolved_at}, [name, avatar_url]
+
+
+cache_snapshot.register("users", _export_users, encode_json, max_age=USER_CACHE_TTL, max_entries=USER_CACHE_MAX)
+
+
+async def _resolve_user(guild: Optional[discord.Guild], user_id: int) -> Tuple[str, Optional[str]]:
+    # (display name, leaderboard avatar URL)
+    member = guild.get_member(user_id) if guild else None
+    if member is not None:
+        return member.display_name, avatar_url_for(member, 40)
+    user = bot.get_user(user_id)
+    if user is not None:
+        return user.name, avatar_url_for(user, 40)
+
+    hit = _resolved_users.get(user_id)
+    if hit is None:
+        stored = cache_snapshot.lookup("users", user_id)
+        if stored is not None:
+            meta, payload = stored
+            hit = _resolved_users[user_id] = (*decode_json(payload), meta["t"])
+    if hit is not None and time.time() - hit[2] < USER_CACHE_TTL:
+        _resolved_users.move_to_end(user_id)
+        return hit[0], hit[1]
+
+    user = await bot.fetch_user(user_id)
+    _resolved_users[user_id] = (user.name, avatar_url_for(user, 40), time.time())
+    _resolved_users.move_to_end(user_id)
+    while len(_resolved_users) > USER_CACHE_MAX:
+        _resolved_users.popitem(last=False)
+    return user.name, avatar_url_for(user, 40)
+
+
+LEADERBOARD_STATS = ["wins", "goals", "saves", "rank", "passes", "steals", "assists", "%"]
+
+
+# (error message, None) or (None, leaderboard image); shared by !leaderboard
+# and /leaderboard
+async def _leaderboard_image(guild: Optional[discord.Guild], stat: str) -> Tuple[Optional[str], Optional[discord.File]]:
+    stat = stat.lower()
+    if stat not in LEADERBOARD_STATS:
+        return "Valid leaderboard types: wins, goals, saves, rank, passes, steals, assists, win%", None
+
+    data = await get_all_last_stats()
+    if not data:
+        return "No cached stats available. Ask users to run `!stats` or `!rank` to generate cached data.", None
+
+    entries = []
+    for user_id, entry in data.items():
+        try:
+            name, avatar_url = await _resolve_user(guild, int(user_id))
+        except Exception:
+            continue
+
+        wins = int(re.sub(r"[^0-9]", "", str(entry.get("wins", 0))))
+        losses = int(re.sub(r"[^0-9]", "", str(entry.get("losses", 0))))
+        total_games = wins + losses
+
+        if stat == "%":
+            value = (round((wins / total_games) * 100, 1) if total_games > 0 else 0.0, total_games)
+            display_val = f"{value[0]:.1f}%"
+            sort_val = value
+        elif stat == "rank":
+            rank_name = entry.get('rank', 'Bronze')
+            sort_val = RANK_PRIORITY.get(rank_name.title(), 0)
+            display_val = rank_name
+        else:
+            display_val = entry.get(stat, 0)
+            try:
+                sort_val = int(re.sub(r"[^0-9]", "", str(display_val)))
+            except Exception:
+                sort_val = 0
+
+        entries.append({
+            "id": user_id,
+            "name": name,
+            "avatar_url": avatar_url,
+            "rank": entry.get('rank', 'Bronze'),
+            "value": display_val,
+            "sort": sort_val
+        })
+
+    reverse = True if stat != "rank" else False
+    if stat == "%":
+        entries.sort(key=lambda x: (x['sort'][0], x['sort'][1]), reverse=True)
+    else:
+        entries.sort(key=lambda x: x['sort'], reverse=reverse)
+
+    rows = [{
+        "id": e['id'],
+        "display_name": e['name'],
+        "avatar_url": e['avatar_url'],
+        "rank": e['rank'],
+        "value": e['value'],
+    } for e in entries]
+
+    out = await images.render_leaderboard(stat, rows)
+    return None, discord.File(out, filename=f"{stat}_leaderboard.png")
+
+
+@bot.command()
+async def leaderboard(ctx, stat: str = "wins"):
+    error, file = await _leaderboard_image(ctx.guild, stat)
+    if error:
+        await ctx.send(error)
+    else:
+        await ctx.send(file=file)
+
+
+# --- Guild analytics ---
+GUILDSTATS_METRICS = (
+    ("win%", "Win %", "{:.1f}%"),
+    ("goals/match", "Goals / match", "{:.2f}"),
+    ("assists/match", "Assists / match", "{:.2f}"),
+    ("saves/match", "Saves / match", "{:.2f}"),
+    ("passes/match", "Passes / match", "{:.2f}"),
+    ("steals/match", "Steals / match", "{:.2f}"),
+    ("wins", "Wins", "{:.0f}"),
+)
+
+
+@bot.command()
+async def guildstats(ctx, member: discord.Member = None):
+    if ctx.guild is None:
+        await ctx.send("❌ This command can only be used in a server.")
+        return
+    try:
+        if not ctx.guild.chunked:
+            await ctx.guild.chunk()
+        member_ids = [m.id for m in ctx.guild.members]
+        columns = await guild_analytics.columns()
+        summary = analytics.summarize(columns, member_ids)
+        if not summary["players"]:
+            await ctx.send("No cached stats available. Ask users to run `!stats` or `!rank` to generate cached data.")
+            return
+
+        embed = discord.Embed(
+            title=f"📊 Guild Stats · {ctx.guild.name}",
+            description=f"{summary['players']} linked players · average · median · top 10%",
+            color=discord.Color.blue(),
+        )
+        lines = []
+        for key, label, fmt in GUILDSTATS_METRICS:
+            metric = summary["metrics"].get(key)
+            if metric:
+                pct = metric["percentiles"]
+                lines.append(f"**{label}** {fmt.format(metric['mean'])} · {fmt.format(pct[50])} · {fmt.format(pct[90])}")
+        if lines:
+            embed.add_field(name="Averages", value="\n".join(lines), inline=False)
+
+        ranks = [f"{name} {count}" for name, count in summary["ranks"].items()]
+        if summary["unranked"]:
+            ranks.append(f"Unranked {summary['unranked']}")
+        embed.add_field(name="Rank distribution", value=" · ".join(ranks) or "n/a", inline=False)
+
+        target = member or ctx.author
+        percentiles = analytics.user_percentiles(columns, str(target.id), member_ids)
+        if percentiles:
+            lines = [f"**{label}** {percentiles[key]:.0f}th" for key, label, _ in GUILDSTATS_METRICS if key in percentiles]
+            embed.add_field(name=f"{target.display_name}'s percentiles", value="\n".join(lines), inline=False)
+
+        await ctx.send(embed=embed)
+    except Exception as e:
+        await ctx.send(f"❌ Error computing guild stats: {e}")
+
+
+# --- Slash commands ---
+# /rank, /stats, /rstats and /leaderboard acknowledge the interaction first
+# (defer), then post what is already known: a cached profile, or the stats
+# saved by the last command, marked as refreshing. The fresh card is edited
+# in once the scrape finishes. A fresh cache hit is posted once and left.
+
+def _refreshing_note(profile_data: dict) -> str:
+    as_of = profile_data.get("stale_as_of")
+    since = f" from <t:{int(as_of)}:R>" if as_of else ""
+    return f"⏳ Showing saved stats{since}; refreshing…"
+
+
+async def _edit_card(interaction: discord.Interaction, content: Optional[str], image, filename: str):
+    if not image:
+        return
+    await interaction.edit_original_response(
+        content=content, attachments=[discord.File(image, filename=filename)],
+        allowed_mentions=discord.AllowedMentions.none(),
+    )
+
+
+async def _progressive_card(interaction: discord.Interaction, member: Optional[discord.Member], ranked: bool,
+                            render, filename: str, on_fresh=None):
+    # render(member, profile_data) -> PNG image; on_fresh(member, profile_data)
+    # runs once a newly scraped profile is in, after last_stats is updated.
+    # A fresh cache hit was stored when it was scraped and is only shown.
+    target = member or interaction.user
+    discord_id = str(target.id)
+    row = await store.get_link(discord_id)
+    if row is None:
+        await interaction.edit_original_response(content=NOT_LINKED)
+        return
+    platform, player_id = row
+
+    quick = scraper.peek_profile(platform, player_id, ranked)
+    if quick is None and not ranked:
+        quick = await _stored_profile(discord_id, platform, player_id)
+    if quick is not None:
+        fresh = "stale_as_of" not in quick
+        await _edit_card(interaction, None if fresh else _refreshing_note(quick), await render(target, quick), filename)
+        if fresh:
+            return
+
+    try:
+        if ranked:
+            profile_data, scraped = await fetch_profile_scraped(platform, player_id, True)
+        else:
+            profile_data, scraped = await _fetch_casual_profile(discord_id, platform, player_id)
+    except Exception as e:
+        if quick is None:
+            raise
+        # Keep the saved card up, just say it couldn't be refreshed
+        as_of = quick.get("stale_as_of")
+        since = f" Showing stats from <t:{int(as_of)}:R>." if as_of else ""
+        await interaction.edit_original_response(content=f"⚠️ Couldn't refresh: {e}.{since}")
+        return
+
+    note = _stale_note(profile_data)
+    if scraped:
+        await _store_fresh(target, platform, player_id, profile_data, ranked, on_fresh)
+    await _edit_card(interaction, note, await render(target, profile_data), filename)
+
+
+async def _store_fresh(member, platform: str, player_id: str, profile_data: dict, ranked: bool, on_fresh=None):
+    # last_stats holds casual stats only, as with the prefix commands
+    if not ranked:
+        await update_last_stats(str(member.id), platform, player_id, profile_data)
+    if on_fresh is not None:
+        await on_fresh(member, profile_data)
+
+
+@bot.tree.command(name="rank", description="Show a member's rank card")
+@app_commands.describe(member="Whose rank to show (defaults to you)")
+async def rank_slash(interaction: discord.Interaction, member: Optional[discord.Member] = None):
+    await interaction.response.defer(thinking=True)
+    try:
+        async def render(target, profile_data):
+            return await generate_rank_card(target.display_name, profile_data.get('rank', 'N/A'), avatar_url_for(target, 96))
+
+        async def on_fresh(target, profile_data):
+            if interaction.guild and isinstance(target, discord.Member):
+                try:
+                    await sync_member_rank_role(target, profile_data.get('rank', 'N/A'))
+                except discord.Forbidden:
+                    await interaction.followup.send("⚠️ Missing permissions to change roles.", ephemeral=True)
+
+        await _progressive_card(interaction, member, False, render, "rank.png", on_fresh)
+    except Exception as e:
+        await interaction.edit_original_response(content=f"❌ Error fetching rank: {e}")
+
+
+@bot.tree.command(name="stats", description="Show a member's casual stats card")
+@app_commands.describe(member="Whose stats to show (defaults to you)")
+async def stats_slash(interaction: discord.Interaction, member: Optional[discord.Member] = None):
+    await interaction.response.defer(thinking=True)
+    try:
+        async def render(target, profile_data):
+            return await generate_stats_card(target.display_name, profile_data, avatar_url_for(target, 128))
+
+        await _progressive_card(interaction, member, False, render, "stats.png")
+    except Exception as e:
+        await interaction.edit_original_response(content=f"❌ Error fetching stats: {e}")
+
+
+@bot.tree.command(name="rstats", description="Show a member's ranked stats card")
+@app_commands.describe(member="Whose ranked stats to show (defaults to you)")
+async def rstats_slash(interaction: discord.Interaction, member: Optional[discord.Member] = None):
+    await interaction.response.defer(thinking=True)
+    try:
+        async def render(target, profile_data):
+            return await generate_rank_stats_card(target.display_name, profile_data, avatar_url_for(target, 128))
+
+        await _progressive_card(interaction, member, True, render, "rank_stats.png")
+    except Exception as e:
+        await interaction.edit_original_response(content=f"❌ Error fetching ranked stats: {e}")
+
+
+@bot.tree.command(name="leaderboard", description="Show the server leaderboard for a stat")
+@app_commands.describe(stat="Stat to rank players by")
+@app_commands.choices(stat=[
+    app_commands.Choice(name="win%" if s == "%" else s, value=s) for s in LEADERBOARD_STATS
+])
+async def leaderboard_slash(interaction: discord.Interaction, stat: str = "wins"):
+    # Built from cached stats only, so there is nothing to refresh
+    await interaction.response.defer(thinking=True)
+    try:
+        error, file = await _leaderboard_image(interaction.guild, stat)
+        if error:
+            await interaction.edit_original_response(content=error)
+        else:
+            await interaction.edit_original_response(attachments=[file])
+    except Exception as e:
+        await interaction.edit_original_response(content=f"❌ Error building leaderboard: {e}")
@@ -0,0 +1,305 @@
+import os
+import time
+import signal
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import Dict, List, NamedTuple, Optional
+
+from . import config
+
+# --- Browser governor ---
+# Every Chromium the scraper launches goes through BrowserGovernor.launch().
+# The browser is started with an extra (inert) switch tagging it with this
+# process's pid and a launch number, so its pid can be found in /proc and so
+# any tagged browser whose launch is over, or whose owning process is gone,
+# is recognisably leaked.
+#
+# While a scrape runs a watchdog checks its wall-clock time and the RSS of
+# the browser's whole process tree; over either limit the tree is killed
+# and the scrape fails with BrowserLimitError. On exit (success or not) the
+# browser is closed, and killed if closing doesn't finish. A reaper kills
+# leaked browsers every BROWSER_REAP_SECONDS.
+#
+# Process inspection reads /proc, so outside Linux only browser.close() and
+# the wall-clock limit apply.
+
+TAG_SWITCH = "--rematch-browser="
+WATCH_INTERVAL = 1.0
+CLOSE_TIMEOUT = 5.0
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class BrowserLimitError(RuntimeError):
+    pass
+
+
+class LiveBrowser(NamedTuple):
+    pid: Optional[int]
+    started: float
+
+
+# --- /proc helpers ---
+
+def _proc_available() -> bool:
+    return os.path.isdir("/proc/self")
+
+
+def _pids() -> List[int]:
+    try:
+        return [int(name) for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return []
+
+
+def _cmdline(pid: int) -> List[str]:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().decode(errors="replace").split("\0")
+    except OSError:
+        return []
+
+
+def _stat(pid: int) -> List[str]:
+    # Fields of /proc/<pid>/stat after the command name: state, ppid, ...
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read().decode(errors="replace")
+        # The command name is in parentheses and may contain spaces
+        return stat[stat.rindex(")") + 2:].split()
+    except (OSError, ValueError):
+        return []
+
+
+def _parent(pid: int) -> Optional[int]:
+    try:
+        return int(_stat(pid)[1])
+    except (ValueError, IndexError):
+        return None
+
+
+def _start_time(pid: int) -> Optional[int]:
+    # Clock ticks after boot; a reused pid gets a later one
+    try:
+        return int(_stat(pid)[19])
+    except (ValueError, IndexError):
+        return None
+
+
+def _rss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # Zombies are dead; they only wait for their parent to collect them
+    state = _stat(pid)[:1]
+    return state != ["Z"]
+
+
+def _tree(root: int) -> List[int]:
+    # root and all of its descendants (renderers, GPU process, zygotes)
+    children: Dict[int, List[int]] = {}
+    for pid in _pids():
+        parent = _parent(pid)
+        if parent is not None:
+            children.setdefault(parent, []).append(pid)
+    tree, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, ()))
+    return tree
+
+
+def _procs(root: int) -> Dict[int, Optional[int]]:
+    # pid -> start time for root's tree, to recognise the same processes later
+    return {pid: _start_time(pid) for pid in _tree(root)}
+
+
+def _same_process(pid: int, started: Optional[int], tag: str) -> bool:
+    # Still the browser's process and not a new one that got its pid: it
+    # carries the tag, or started when the one seen in the tree did
+    if TAG_SWITCH + tag in _cmdline(pid):
+        return True
+    return started is not None and _start_time(pid) == started
+
+
+def _kill(procs: Dict[int, Optional[int]], tag: str) -> int:
+    killed = 0
+    for pid, started in procs.items():
+        if not _alive(pid) or not _same_process(pid, started, tag):
+            continue
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed += 1
+        except (ProcessLookupError, PermissionError):
+            pass
+    return killed
+
+
+def _kill_tree(root: int, tag: str) -> int:
+    return _kill(_procs(root), tag)
+
+
+def _tagged_browsers() -> Dict[int, str]:
+    # pid -> tag ("<owner pid>-<launch>") of every tagged browser process
+    # whose parent isn't tagged too (i.e. the browser's main process)
+    tagged = {}
+    for pid in _pids():
+        for arg in _cmdline(pid):
+            if arg.startswith(TAG_SWITCH):
+                tagged[pid] = arg[len(TAG_SWITCH):]
+                break
+    return {pid: tag for pid, tag in tagged.items() if _parent(pid) not in tagged}
+
+
+class BrowserGovernor:
+    def __init__(self, max_seconds: float = config.BROWSER_MAX_SECONDS,
+                 max_rss_mb: float = config.BROWSER_MAX_RSS_MB,
+                 reap_seconds: float = config.BROWSER_REAP_SECONDS):
+        self.max_seconds = max_seconds
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.reap_seconds = reap_seconds
+        self.live: Dict[str, LiveBrowser] = {}
+        self.launched = 0
+        self.killed_time = 0
+        self.killed_memory = 0
+        self.reaped = 0
+        self._launches = itertools.count(1)
+        self._reaper: Optional[asyncio.Task] = None
+
+    def _find_pid(self, tag: str) -> Optional[int]:
+        if not _proc_available():
+            return None
+        for pid, found in _tagged_browsers().items():
+            if found == tag:
+                return pid
+        return None
+
+    def tree_rss(self, pid: Optional[int]) -> int:
+        return sum(_rss(p) for p in _tree(pid)) if pid is not None and _proc_available() else 0
+
+    async def _watch(self, scrape: asyncio.Task, tag: str, pid: Optional[int], started: float, breach: list):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(WATCH_INTERVAL)
+            elapsed = time.monotonic() - started
+            if elapsed > self.max_seconds:
+                self.killed_time += 1
+                breach.append(f"browser ran over {self.max_seconds:.0f}s")
+            elif pid is not None:
+                rss = await loop.run_in_executor(None, self.tree_rss, pid)
+                if rss > self.max_rss:
+                    self.killed_memory += 1
+                    breach.append(f"browser used {rss / 1024 / 1024:.0f} MB (limit {self.max_rss / 1024 / 1024:.0f} MB)")
+            if breach:
+                print(f"⚠️ Killing browser {pid}: {breach[0]}")
+                if pid is not None:
+                    _kill_tree(pid, tag)
+                # Without a pid the browser can't be killed; fail the scrape
+                # and let the close in launch() clean up
+                scrape.cancel()
+                return
+
+    @asynccontextmanager
+    async def launch(self, playwright):
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.get_running_loop().create_task(self._reap_loop())
+
+        tag = f"{os.getpid()}-{next(self._launches)}"
+        started = time.monotonic()
+        # Registered before the launch so the reaper never takes it for a leak
+        self.live[tag] = LiveBrowser(None, started)
+        try:
+            browser = await playwright.chromium.launch(headless=True, args=[TAG_SWITCH + tag])
+        except BaseException:
+            del self.live[tag]
+            raise
+        self.launched += 1
+        pid = await asyncio.get_running_loop().run_in_executor(None, self._find_pid, tag)
+        self.live[tag] = LiveBrowser(pid, started)
+
+        breach: List[str] = []
+        scrape = asyncio.current_task()
+        watchdog = asyncio.ensure_future(self._watch(scrape, tag, pid, started, breach))
+        try:
+            yield browser
+        except asyncio.CancelledError:
+            if breach:
+                # Our own cancel, not the caller's: turn it into an error
+                if hasattr(scrape, "uncancel"):
+                    scrape.uncancel()
+                raise BrowserLimitError(f"Scrape stopped: {breach[0]}") from None
+            raise
+        except Exception as e:
+            if breach:
+                raise BrowserLimitError(f"Scrape stopped: {breach[0]}") from e
+            raise
+        finally:
+            watchdog.cancel()
+            loop = asyncio.get_running_loop()
+            # Children that outlive a hung browser are reparented, so the tree
+            # has to be taken while it is still attached
+            procs = await loop.run_in_executor(None, _procs, pid) if pid is not None and _proc_available() else {}
+            try:
+                await asyncio.wait_for(browser.close(), CLOSE_TIMEOUT)
+            except Exception:
+                # Only a browser that didn't close is killed; each pid is
+                # checked again first, as by now it may belong to another process
+                if procs:
+                    await loop.run_in_executor(None, _kill, procs, tag)
+            del self.live[tag]
+
+    def reap(self) -> int:
+        # Kill tagged browsers that no launch() is using: ours after their
+        # launch ended, and any whose owning process has died
+        if not _proc_available():
+            return 0
+        own = str(os.getpid())
+        reaped = 0
+        for pid, tag in _tagged_browsers().items():
+            owner, _, _ = tag.partition("-")
+            if owner == own:
+                if tag in self.live:
+                    continue
+            elif not owner.isdigit() or _alive(int(owner)):
+                continue
+            print(f"Reaping leaked browser {pid} ({tag})")
+            if _kill_tree(pid, tag):
+                reaped += 1
+        self.reaped += reaped
+        return reaped
+
+    async def _reap_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.reap)
+            except Exception as e:
+                print(f"⚠️ Browser reaper failed: {e}")
+            await asyncio.sleep(self.reap_seconds)
+
+    def metrics(self) -> dict:
+        rss = sum(self.tree_rss(b.pid) for b in list(self.live.values()))
+        return {
+            "pid": os.getpid(),
+            "live": len(self.live),
+            "rss_mb": round(rss / 1024 / 1024, 1),
+            "launched": self.launched,
+            "killed_time": self.killed_time,
+            "killed_memory": self.killed_memory,
+            "reaped": self.reaped,
+        }
+
+
+browser_governor = BrowserGovernor()
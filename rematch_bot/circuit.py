@@ -0,0 +1,112 @@
+import time
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, Tuple, Type
+
+# --- Circuit breaker ---
+# Tracks the outcome and latency of the last `window` calls. Once enough of
+# them failed or ran slow the breaker opens: calls are rejected immediately
+# and a background probe checks for recovery every `open_seconds` (doubling
+# up to `max_open_seconds` while the probe keeps failing). A passing probe
+# closes the breaker again. Exceptions listed in `ignore` count as successes.
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, probe: Optional[Callable[[], Awaitable[bool]]] = None,
+                 window: int = 20, min_calls: int = 5, failure_rate: float = 0.5,
+                 slow_call_seconds: float = 15.0, slow_rate: float = 0.5,
+                 open_seconds: float = 30.0, max_open_seconds: float = 300.0,
+                 probe_timeout: float = 10.0, ignore: Tuple[Type[BaseException], ...] = ()):
+        self.name = name
+        self.ignore = ignore
+        self.probe = probe
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.probe_timeout = probe_timeout
+        self.state = "closed"
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+        self.rejected = 0
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._open_for = open_seconds
+        self._probe_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != "closed"
+
+    def retry_after(self) -> float:
+        if self.opened_at is None or not self.is_open:
+            return 0.0
+        return max(0.0, self.opened_at + self._open_for - time.time())
+
+    def record(self, ok: bool, elapsed: float):
+        if self.is_open:
+            # Calls that started before the trip don't count towards recovery
+            return
+        self._outcomes.append((ok, elapsed >= self.slow_call_seconds))
+        n = len(self._outcomes)
+        if n < self.min_calls:
+            return
+        failures = sum(1 for ok, _ in self._outcomes if not ok)
+        slow = sum(1 for _, is_slow in self._outcomes if is_slow)
+        if failures / n >= self.failure_rate or slow / n >= self.slow_rate:
+            self._trip(f"{failures}/{n} failed, {slow}/{n} slow")
+
+    def _trip(self, reason: str):
+        self.state = "open"
+        self.opened_at = time.time()
+        self.trips += 1
+        self._outcomes.clear()
+        print(f"Circuit {self.name} open for {self._open_for:.0f}s ({reason})")
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+
+    async def _probe_loop(self):
+        while self.is_open:
+            await asyncio.sleep(self.retry_after())
+            self.state = "half_open"
+            ok = True
+            if self.probe is not None:
+                t0 = time.monotonic()
+                try:
+                    ok = bool(await asyncio.wait_for(self.probe(), self.probe_timeout))
+                except Exception:
+                    ok = False
+                ok = ok and time.monotonic() - t0 < self.slow_call_seconds
+            if ok:
+                self.state = "closed"
+                self.opened_at = None
+                self._open_for = self.open_seconds
+                print(f"Circuit {self.name} closed")
+            else:
+                self._open_for = min(self._open_for * 2, self.max_open_seconds)
+                self.state = "open"
+                self.opened_at = time.time()
+                print(f"Circuit {self.name} probe failed; open for {self._open_for:.0f}s")
+
+    async def call(self, fn: Callable[..., Awaitable], *args, **kwargs):
+        if self.is_open:
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.name} is unavailable right now; try again in a few minutes")
+        t0 = time.monotonic()
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except self.ignore:
+            self.record(True, time.monotonic() - t0)
+            raise
+        except Exception:
+            self.record(False, time.monotonic() - t0)
+            raise
+        self.record(True, time.monotonic() - t0)
+        return result
@@ -0,0 +1,93 @@
+import os
+from typing import List, Optional, Union
+
+# Runtime settings, all read from the environment.
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off", "")
+
+
+def parse_shard_ids(value: Optional[str]) -> Optional[List[int]]:
+    # "0-3,6,8-9" -> [0, 1, 2, 3, 6, 8, 9]
+    if not value:
+        return None
+    ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        if sep:
+            ids.extend(range(int(start), int(end) + 1))
+        else:
+            ids.append(int(start))
+    return sorted(set(ids))
+
+
+def _shard_count(value: Optional[str]) -> Union[int, str, None]:
+    if not value:
+        return None
+    if value.strip().lower() == "auto":
+        return "auto"
+    return int(value)
+
+
+COMMAND_PREFIX = "!"
+
+# Publish the slash commands (/rank, /stats, /rstats, /leaderboard) at startup.
+# Only one process needs to; `--processes` turns it off for all but the first.
+SYNC_APP_COMMANDS = _env_flag("SYNC_APP_COMMANDS", True)
+
+# Rank role sync cadence
+ROLE_SYNC_MINUTES = float(os.getenv("ROLE_SYNC_MINUTES", "30"))
+
+# Rank-up / milestone announcements go to the text channel with this name in
+# each guild, batched into one message per interval. Empty disables them.
+ANNOUNCE_CHANNEL = os.getenv("ANNOUNCE_CHANNEL", "rank-updates").strip()
+ANNOUNCE_INTERVAL_SECONDS = float(os.getenv("ANNOUNCE_INTERVAL_SECONDS", "60"))
+
+# Profile site; overridable so benchmarks can point at a local fixture server
+REMATCHTRACKER_URL = os.getenv("REMATCHTRACKER_URL", "https://www.rematchtracker.com").rstrip("/")
+
+# Per-step limit for a profile scrape (page load, then the profile header)
+SCRAPE_TIMEOUT = float(os.getenv("SCRAPE_TIMEOUT", "20"))
+
+# Limits for each Chromium launched to scrape: wall-clock seconds and resident
+# memory of the whole browser process tree. Browsers over either limit are
+# killed; leaked ones are looked for every BROWSER_REAP_SECONDS.
+BROWSER_MAX_SECONDS = float(os.getenv("BROWSER_MAX_SECONDS", "60"))
+BROWSER_MAX_RSS_MB = float(os.getenv("BROWSER_MAX_RSS_MB", "1024"))
+BROWSER_REAP_SECONDS = float(os.getenv("BROWSER_REAP_SECONDS", "60"))
+
+# Scraped profiles younger than this are reused instead of scraping again
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "120"))
+
+# How long a profile that doesn't exist is remembered before trying again
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "600"))
+
+# Warm-start snapshot of the in-memory caches; empty disables it
+CACHE_SNAPSHOT_PATH = os.getenv("CACHE_SNAPSHOT_PATH", "cache_snapshot.bin")
+CACHE_SNAPSHOT_MINUTES = float(os.getenv("CACHE_SNAPSHOT_MINUTES", "10"))
+
+# unix:/path or tcp:host:port; unset keeps scraping in the bot process. A TCP
+# address other than loopback also needs SCRAPER_TOKEN, shared with workers.
+SCRAPER_ADDRESS = os.getenv("SCRAPER_ADDRESS")
+
+# Sharding. SHARD_COUNT ("auto" or a number) switches to AutoShardedBot;
+# SHARD_IDS limits this process to a subset so ranges can run as separate
+# processes (see `python -m rematch_bot --processes N`).
+SHARD_COUNT = _shard_count(os.getenv("SHARD_COUNT"))
+SHARD_IDS = parse_shard_ids(os.getenv("SHARD_IDS"))
+# discord.py can't pick the shard count when only some shards run here
+if SHARD_IDS and not isinstance(SHARD_COUNT, int):
+    raise SystemExit("SHARD_IDS needs a numeric SHARD_COUNT (the total shard count across all processes)")
+if SHARD_IDS and SHARD_IDS[-1] >= SHARD_COUNT:
+    raise SystemExit(f"SHARD_IDS go up to {SHARD_IDS[-1]} but SHARD_COUNT is {SHARD_COUNT}")
+
+# Requesting every member of every guild at startup is the heaviest part of
+# a large-guild login; with this off members are chunked per guild on demand.
+CHUNK_GUILDS_AT_STARTUP = _env_flag("CHUNK_GUILDS_AT_STARTUP", True)
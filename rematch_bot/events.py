@@ -0,0 +1,121 @@
+import re
+import asyncio
+from typing import List, NamedTuple, Optional
+
+from .ranks import RANK_PRIORITY
+
+# --- Stat change events ---
+# update_last_stats diffs each new entry against the one it replaces and
+# publishes what changed (rank up/down, win milestones, win streaks) on an
+# in-process bus. Each diff only looks at the two entries involved.
+
+WIN_MILESTONES = (10, 25, 50, 100, 250, 500, 750, 1000)
+WIN_MILESTONE_STEP = 500  # past the last fixed milestone, every 500 wins
+STREAK_THRESHOLDS = (3, 5, 10, 15, 20, 30)
+EVENT_QUEUE_SIZE = 1000
+
+
+class StatEvent(NamedTuple):
+    kind: str  # "rank_up", "rank_down", "win_milestone", "win_streak"
+    discord_id: str
+    old: object
+    new: object
+
+
+def _to_int(value) -> Optional[int]:
+    digits = re.sub(r"[^0-9]", "", str(value if value is not None else ""))
+    return int(digits) if digits else None
+
+
+def rank_tier(rank) -> Optional[int]:
+    # Lower is better, as in RANK_PRIORITY; divisions ("Diamond 2") are ignored
+    parts = str(rank or "").split()
+    return RANK_PRIORITY.get(parts[0].title()) if parts else None
+
+
+def _same_account(previous: Optional[dict], entry: dict) -> bool:
+    return bool(previous) and (previous.get("platform"), previous.get("player_id")) == (
+        entry.get("platform"), entry.get("player_id"))
+
+
+def _win_milestone(old: int, new: int) -> Optional[int]:
+    if new <= old:
+        return None
+    last = WIN_MILESTONES[-1]
+    if new > last:
+        stepped = new - (new - last) % WIN_MILESTONE_STEP
+        if stepped > old:
+            return stepped
+    for milestone in reversed(WIN_MILESTONES):
+        if old < milestone <= new:
+            return milestone
+    return None
+
+
+def next_win_streak(previous: Optional[dict], entry: dict) -> int:
+    # Wins gained since the last update that added a loss. Updates are
+    # snapshots, so a loss anywhere in between resets the streak.
+    if not _same_account(previous, entry):
+        return 0
+    streak = _to_int(previous.get("win_streak")) or 0
+    old_wins, new_wins = _to_int(previous.get("wins")), _to_int(entry.get("wins"))
+    old_losses, new_losses = _to_int(previous.get("losses")), _to_int(entry.get("losses"))
+    if None in (old_wins, new_wins, old_losses, new_losses):
+        return streak
+    if new_losses > old_losses:
+        return 0
+    return streak + max(0, new_wins - old_wins)
+
+
+def diff_stats(discord_id: str, previous: Optional[dict], entry: dict) -> List[StatEvent]:
+    if not _same_account(previous, entry):
+        return []
+    events = []
+
+    old_tier, new_tier = rank_tier(previous.get("rank")), rank_tier(entry.get("rank"))
+    if old_tier is not None and new_tier is not None and old_tier != new_tier:
+        kind = "rank_up" if new_tier < old_tier else "rank_down"
+        events.append(StatEvent(kind, discord_id, previous.get("rank"), entry.get("rank")))
+
+    old_wins, new_wins = _to_int(previous.get("wins")), _to_int(entry.get("wins"))
+    if old_wins is not None and new_wins is not None:
+        milestone = _win_milestone(old_wins, new_wins)
+        if milestone is not None:
+            events.append(StatEvent("win_milestone", discord_id, old_wins, milestone))
+
+    old_streak, new_streak = _to_int(previous.get("win_streak")) or 0, _to_int(entry.get("win_streak")) or 0
+    crossed = [t for t in STREAK_THRESHOLDS if old_streak < t <= new_streak]
+    if crossed:
+        events.append(StatEvent("win_streak", discord_id, old_streak, new_streak))
+    return events
+
+
+class EventBus:
+    # Fan-out to bounded subscriber queues; a subscriber that falls behind
+    # loses events instead of holding up stat updates.
+    def __init__(self):
+        self._subscribers: List[asyncio.Queue] = []
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, maxsize: int = EVENT_QUEUE_SIZE) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        try:
+            self._subscribers.remove(queue)
+        except ValueError:
+            pass
+
+    def publish(self, event: StatEvent):
+        self.published += 1
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+
+stat_events = EventBus()
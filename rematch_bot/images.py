@@ -0,0 +1,622 @@
+import os
+import re
+import asyncio
+from collections import OrderedDict
+from functools import lru_cache
+from io import BytesIO
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .events import rank_tier
+from .ranks import normalize_rank_name
+from .snapshot import cache_snapshot, decode_image, encode_image, image_meta
+
+# aiohttp for avatar downloads
+try:
+    import aiohttp
+except Exception:
+    aiohttp = None
+
+# Pillow is imported on first use (see _require_pil) so importing this module
+# stays cheap; warm_up() does it ahead of time in the background.
+Image = ImageDraw = ImageFont = None
+
+
+# --- Image helpers and generators ---
+
+def _require_pil():
+    global Image, ImageDraw, ImageFont
+    if Image is None or ImageDraw is None or ImageFont is None:
+        try:
+            from PIL import Image, ImageDraw, ImageFont
+        except Exception as e:
+            raise RuntimeError("Pillow (PIL) is required for image generation commands. Install it or disable these commands.") from e
+
+
+# --- Avatar fetching / caching ---
+# Discord's CDN can resize avatars server-side, so we ask for the smallest size
+# that covers the slot we draw into and keep the processed (circular) result.
+AVATAR_CACHE_MAX = 512
+_avatar_cache: "OrderedDict[Tuple[str, int, int], Image.Image]" = OrderedDict()
+
+
+def _cdn_size(size: int) -> int:
+    # CDN sizes must be a power of two between 16 and 4096
+    n = 16
+    while n < size and n < 4096:
+        n *= 2
+    return n
+
+
+def avatar_url_for(user, size: int) -> Optional[str]:
+    avatar = getattr(user, "avatar", None)
+    if not avatar:
+        return None
+    try:
+        return str(avatar.with_static_format("webp").with_size(_cdn_size(size)))
+    except Exception:
+        return None
+
+
+def _make_circular_avatar(data: bytes, size: int, border: int) -> "Image.Image":
+    avatar_img = Image.open(BytesIO(data)).convert("RGBA")
+    w, h = avatar_img.size
+    min_dim = min(w, h)
+    left = (w - min_dim) // 2
+    top = (h - min_dim) // 2
+    avatar_img = avatar_img.crop((left, top, left + min_dim, top + min_dim))
+    if avatar_img.size != (size, size):
+        avatar_img = avatar_img.resize((size, size), Image.LANCZOS)
+
+    mask = Image.new("L", (size, size), 0)
+    mask_draw = ImageDraw.Draw(mask)
+    mask_draw.ellipse((0, 0, size, size), fill=255)
+
+    border_layer = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    border_draw = ImageDraw.Draw(border_layer)
+    border_draw.ellipse((0, 0, size, size), outline=(255, 255, 255, 255), width=border)
+
+    avatar_circular = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    avatar_circular.paste(avatar_img, (0, 0), mask)
+    return Image.alpha_composite(avatar_circular, border_layer)
+
+
+async def get_circular_avatar(url: Optional[str], size: int, border: int, session=None) -> Optional["Image.Image"]:
+    _require_pil()
+    if not url or aiohttp is None:
+        return None
+
+    key = (url, size, border)
+    cached = _avatar_cache.get(key)
+    if cached is not None:
+        _avatar_cache.move_to_end(key)
+        return cached
+    stored = cache_snapshot.lookup("avatars", key)
+    if stored is not None:
+        try:
+            avatar_final = _avatar_cache[key] = decode_image(*stored)
+            return avatar_final
+        except Exception:
+            pass
+
+    close_session = False
+    try:
+        if session is None:
+            session = aiohttp.ClientSession()
+            close_session = True
+        async with session.get(url, timeout=10) as resp:
+            if resp.status != 200:
+                return None
+            data = await resp.read()
+    except Exception:
+        return None
+    finally:
+        if close_session:
+            await session.close()
+
+    try:
+        loop = asyncio.get_running_loop()
+        avatar_final = await loop.run_in_executor(None, _make_circular_avatar, data, size, border)
+    except Exception:
+        return None
+
+    _avatar_cache[key] = avatar_final
+    while len(_avatar_cache) > AVATAR_CACHE_MAX:
+        _avatar_cache.popitem(last=False)
+    return avatar_final
+
+
+# --- Fonts and text fitting ---
+# Fonts are resolved once per family along a fallback chain and cached per
+# size; text widths are cached per (text, family, size). Fitting binary-
+# searches the size against those caches instead of reloading fonts.
+FONT_DIR = "/usr/share/fonts/truetype/dejavu"
+FONT_FAMILIES = {
+    "sans": (f"{FONT_DIR}/DejaVuSans.ttf", "DejaVuSans.ttf", "arial.ttf", "LiberationSans-Regular.ttf"),
+    "sans-bold": (f"{FONT_DIR}/DejaVuSans-Bold.ttf", "DejaVuSans-Bold.ttf", "arialbd.ttf", "LiberationSans-Bold.ttf"),
+    "arial": ("arial.ttf", f"{FONT_DIR}/DejaVuSans.ttf", "DejaVuSans.ttf", "LiberationSans-Regular.ttf"),
+}
+FONT_SIZE_MIN = 10
+
+_font_paths: Dict[str, Optional[str]] = {}
+
+
+def _font_path(family: str) -> Optional[str]:
+    if family not in _font_paths:
+        path = None
+        for candidate in FONT_FAMILIES[family]:
+            try:
+                ImageFont.truetype(candidate, 12)
+                path = candidate
+                break
+            except OSError:
+                continue
+        if path is None:
+            print(f"⚠️ No TrueType font found for {family!r}; using Pillow's built-in font")
+        _font_paths[family] = path
+    return _font_paths[family]
+
+
+@lru_cache(maxsize=256)
+def get_font(family: str, size: int):
+    _require_pil()
+    path = _font_path(family)
+    if path is not None:
+        return ImageFont.truetype(path, size)
+    try:
+        # Pillow >= 10.1 ships a scalable default font
+        return ImageFont.load_default(size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=8192)
+def text_width(text: str, family: str, size: int) -> float:
+    return get_font(family, size).getlength(text)
+
+
+def fit_size(measure: Callable[[int], float], max_width: float, max_size: int,
+             min_size: int = FONT_SIZE_MIN) -> int:
+    # Largest size in [min_size, max_size] with measure(size) <= max_width;
+    # measure must grow with size
+    if measure(max_size) <= max_width:
+        return max_size
+    best = min_size
+    lo, hi = min_size, max_size - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if measure(mid) <= max_width:
+            best = mid
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    return best
+
+
+def _ellipsize(text: str, max_width: float, font) -> str:
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if font.getlength(text[:mid].rstrip() + "…") <= max_width:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + "…"
+
+
+@lru_cache(maxsize=4096)
+def fit_text(text: str, max_width: float, family: str = "sans", max_size: int = 32,
+             min_size: int = FONT_SIZE_MIN) -> Tuple["ImageFont.FreeTypeFont", str]:
+    # (font, text) for the largest size that fits; text that is still too
+    # wide at min_size is cut short with an ellipsis
+    size = fit_size(lambda s: text_width(text, family, s), max_width, max_size, min_size)
+    font = get_font(family, size)
+    if text_width(text, family, size) > max_width:
+        text = _ellipsize(text, max_width, font)
+    return font, text
+
+
+def _safe_int(val) -> int:
+    try:
+        return int(re.sub(r"[^0-9]", "", str(val)))
+    except Exception:
+        return 0
+
+
+RANK_ICONS = {
+    "Bronze": "assets/ranks/bronze.png",
+    "Silver": "assets/ranks/silver.png",
+    "Gold": "assets/ranks/gold.png",
+    "Platinum": "assets/ranks/platinum.png",
+    "Diamond": "assets/ranks/diamond.png",
+    "Master": "assets/ranks/master.png",
+    "Elite": "assets/ranks/elite.png"
+}
+
+
+# Shared by the casual and ranked stats cards (800x300, avatar on the right)
+async def _render_stats_card(title_text, profile_data, avatar_url=None) -> "Image.Image":
+    _require_pil()
+
+    bg = Image.new("RGBA", (800, 300), (30, 30, 30, 255))
+    draw = ImageDraw.Draw(bg)
+
+    avatar_final = await get_circular_avatar(avatar_url, 128, 4)
+    if avatar_final is not None:
+        avatar_x = 640
+        avatar_y = (300 - 128) // 2
+        bg.paste(avatar_final, (avatar_x, avatar_y), avatar_final)
+
+    rank_name = str(profile_data.get('rank', ''))
+    icon_path = None
+    for key in RANK_ICONS:
+        if key.lower() in rank_name.lower() and os.path.exists(RANK_ICONS[key]):
+            icon_path = RANK_ICONS[key]
+            break
+
+    # Title and rank share one size; together they must end before the avatar
+    title_slot = 580
+    if icon_path:
+        title_size = fit_size(lambda size: text_width(title_text, "sans", size) + 50 + text_width(rank_name, "sans", size),
+                              title_slot, 36)
+    else:
+        title_size = fit_size(lambda size: text_width(title_text, "sans", size), title_slot, 36)
+    title_font = get_font("sans", title_size)
+    title_width = text_width(title_text, "sans", title_size)
+    draw.text((30, 30), title_text, font=title_font, fill=(255, 255, 255))
+
+    if icon_path:
+        try:
+            rank_icon = Image.open(icon_path).convert("RGBA").resize((36, 36), Image.LANCZOS)
+            bg.paste(rank_icon, (40 + int(title_width), 30), rank_icon)
+            draw.text((80 + int(title_width), 30), rank_name, font=title_font, fill=(255, 215, 0))
+        except Exception:
+            pass
+
+    y_stats = 110
+    wins = _safe_int(profile_data.get('wins', 0))
+    losses = _safe_int(profile_data.get('losses', 0))
+    total_games = wins + losses
+    win_percent = round((wins / total_games) * 100, 1) if total_games > 0 else 0.0
+
+    left_column = [
+        ("Goals", profile_data.get('goals', 'N/A')),
+        ("Passes", profile_data.get('passes', 'N/A')),
+        ("Assists", profile_data.get('assists', 'N/A')),
+    ]
+    right_column = [
+        ("Saves", profile_data.get('saves', 'N/A')),
+        ("Steals", profile_data.get('steals', 'N/A')),
+    ]
+
+    # (text, slot width) for everything drawn at the stat size; the largest
+    # size at which all of them fit is used for the whole block
+    slots = [("Wins:", 85), (str(wins), 120), ("Losses:", 115), (str(losses), 240),
+             ("Win%:", 115), (f"{win_percent}%", 240)]
+    slots += [(f"{label}: {value}", 210) for label, value in left_column]
+    slots += [(f"{label}: {value}", 360) for label, value in right_column]
+    stat_size = fit_size(lambda size: max(text_width(t, "sans", size) - w for t, w in slots), 0, 32)
+    stat_font = get_font("sans", stat_size)
+
+    draw.text((30, y_stats), "Wins:", font=stat_font, fill=(0, 255, 0))
+    draw.text((120, y_stats), str(wins), font=stat_font, fill=(255, 255, 255))
+    draw.text((250, y_stats), "Losses:", font=stat_font, fill=(255, 0, 0))
+    draw.text((370, y_stats), str(losses), font=stat_font, fill=(255, 255, 255))
+
+    y_base = y_stats + 50
+    row_spacing = 36
+    for i, (label, value) in enumerate(right_column):
+        draw.text((250, y_base + i * row_spacing), f"{label}: {value}", font=stat_font, fill=(200, 200, 200))
+    y_win = y_base + len(right_column) * row_spacing
+    draw.text((250, y_win), "Win%:", font=stat_font, fill=(100, 200, 255))
+    draw.text((370, y_win), f"{win_percent}%", font=stat_font, fill=(255, 255, 255))
+
+    for i, (label, value) in enumerate(left_column):
+        draw.text((30, y_base + i * row_spacing), f"{label}: {value}", font=stat_font, fill=(200, 200, 200))
+
+    return bg
+
+
+def _png(img) -> BytesIO:
+    # Cards are rendered in memory: names aren't unique, and two commands
+    # (or two members of one batch) may be drawing the same name at once
+    out = BytesIO()
+    img.save(out, format='PNG')
+    out.seek(0)
+    return out
+
+
+async def generate_stats_card(user_name, profile_data, avatar_url=None):
+    bg = await _render_stats_card(f"{user_name}'s Stats", profile_data, avatar_url)
+
+    return _png(bg)
+
+
+async def generate_rank_stats_card(user_name, profile_data, avatar_url=None):
+    bg = await _render_stats_card(f"{user_name}'s Ranked Stats", profile_data, avatar_url)
+
+    return _png(bg)
+
+
+async def generate_rank_card(user_name, rank, avatar_url=None):
+    _require_pil()
+
+    bg = Image.new("RGBA", (600, 200), (30, 30, 30, 255))
+    draw = ImageDraw.Draw(bg)
+
+    try:
+        icon_path = f"assets/ranks/{str(rank).lower().replace(' ', '_')}.png"
+        if os.path.exists(icon_path):
+            rank_icon = Image.open(icon_path).convert("RGBA").resize((128, 128))
+            bg.paste(rank_icon, (25, 36), rank_icon)
+    except Exception:
+        pass
+
+    avatar_final = await get_circular_avatar(avatar_url, 96, 4)
+    if avatar_final is not None:
+        avatar_x = 600 - 96 - 30
+        avatar_y = (200 - 96) // 2
+        bg.paste(avatar_final, (avatar_x, avatar_y), avatar_final)
+
+    # Name and rank both fit in the 304px between the emblem and the avatar
+    font, text = fit_text(f"{user_name}'s Rank", 304, "arial", 36, 12)
+    draw.text((170, 70), text, font=font, fill=(255, 255, 255))
+    rank_font, rank = fit_text(str(rank), 304, "arial", 32, 12)
+    draw.text((170, 110), rank, font=rank_font, fill=(255, 215, 0))
+
+    return _png(bg)
+
+
+# --- Compare card ---
+# One column per player (avatar, name, then a row per stat) next to a label
+# column; the best value in each row is drawn in gold.
+COMPARE_LABEL_W = 170
+COMPARE_COL_W = 180
+COMPARE_HEADER_H = 150
+COMPARE_ROW_H = 36
+COMPARE_MAX_PLAYERS = 6
+
+
+def _ratio(a: int, b: int) -> Optional[float]:
+    return a / b if b > 0 else None
+
+
+def _compare_rows(profile_data: dict) -> List[Tuple[str, Optional[float], str]]:
+    # (label, sort value, text); higher sort values are better, None never wins
+    wins = _safe_int(profile_data.get('wins', 0))
+    losses = _safe_int(profile_data.get('losses', 0))
+    games = wins + losses
+    rank_name = str(profile_data.get('rank', 'N/A'))
+    tier = rank_tier(rank_name)
+    rows = [
+        ("Rank", -tier if tier is not None else None, rank_name),
+        ("Wins", wins, str(wins)),
+        ("Losses", -losses if games else None, str(losses)),
+    ]
+    win_rate = _ratio(wins * 100, games)
+    rows.append(("Win%", win_rate, f"{win_rate:.1f}%" if win_rate is not None else "N/A"))
+    for field in ("goals", "assists", "saves", "passes", "steals"):
+        value = profile_data.get(field, 'N/A')
+        total = _safe_int(value) if str(value) != 'N/A' else None
+        rows.append((field.capitalize(), total, str(value)))
+        if field == "goals":
+            per_match = _ratio(total, games) if total is not None else None
+            rows.append(("Goals/match", per_match, f"{per_match:.2f}" if per_match is not None else "N/A"))
+    return rows
+
+
+# players: (display name, profile_data, avatar_url), at most COMPARE_MAX_PLAYERS
+async def render_compare_card(players: List[Tuple[str, dict, Optional[str]]]) -> BytesIO:
+    _require_pil()
+
+    table = [_compare_rows(profile_data) for _, profile_data, _ in players]
+    labels = [label for label, _, _ in table[0]]
+    width = COMPARE_LABEL_W + len(players) * COMPARE_COL_W + 20
+    height = COMPARE_HEADER_H + len(labels) * COMPARE_ROW_H + 20
+
+    img = Image.new("RGBA", (width, height), LB_BG)
+    draw = ImageDraw.Draw(img)
+
+    avatars = await asyncio.gather(*(get_circular_avatar(avatar_url, 72, 3) for _, _, avatar_url in players))
+    for col, ((name, _, _), avatar_final) in enumerate(zip(players, avatars)):
+        center = COMPARE_LABEL_W + col * COMPARE_COL_W + COMPARE_COL_W // 2
+        if avatar_final is not None:
+            img.paste(avatar_final, (center - avatar_final.width // 2, 20), avatar_final)
+        name_font, name_text = fit_text(str(name), COMPARE_COL_W - 16, "sans-bold", 22, 12)
+        draw.text((center, 130), name_text, font=name_font, anchor="ms", fill=(255, 255, 255))
+
+    label_font = get_font("sans", LB_FONT_SIZE)
+    for row, label in enumerate(labels):
+        y = COMPARE_HEADER_H + row * COMPARE_ROW_H
+        if row % 2 == 0:
+            draw.rectangle((10, y, width - 10, y + COMPARE_ROW_H - 1), fill=(35, 35, 35, 255))
+        draw.text((20, y + 8), label, font=label_font, fill=(173, 216, 230))
+
+        values = [cells[row][1] for cells in table]
+        known = [v for v in values if v is not None]
+        # Only highlight a row that actually separates the players
+        best = max(known) if len(players) > 1 and len(set(known)) > 1 else None
+        for col, cells in enumerate(table):
+            x = COMPARE_LABEL_W + col * COMPARE_COL_W
+            colour = (255, 215, 0) if best is not None and values[col] == best else (220, 220, 220)
+            font, text = fit_text(cells[row][2], COMPARE_COL_W - 16, "sans", LB_FONT_SIZE)
+            draw.text((x + COMPARE_COL_W // 2, y + COMPARE_ROW_H // 2), text, font=font, anchor="mm", fill=colour)
+
+    out = BytesIO()
+    img.save(out, format='PNG')
+    out.seek(0)
+    return out
+
+
+# --- Leaderboard rendering ---
+# Each row is drawn once as a tile (avatar, name, emblem, value) and cached
+# under everything that affects its pixels; the position number is drawn
+# on the board so tiles survive players moving up or down. A board is a
+# copy of the cached background and header with the tiles pasted on, so
+# only rows whose player, stats or position colour changed are redrawn
+# (and only their avatars fetched).
+LB_ROWS_PER_COL = 10
+LB_ROW_H = 56
+LB_COL_W = 360
+LB_HEADER_H = 80
+LB_BG = (25, 25, 25, 255)
+LB_FONT_SIZE = 18
+# The tile cache is bounded by decoded size; a tile is ~79 KB, so that's
+# ~416 tiles, which also caps the tiles section of the cache snapshot
+TILE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+TILE_CACHE_MAX = TILE_CACHE_MAX_BYTES // (LB_COL_W * LB_ROW_H * 4)
+_tile_cache: "OrderedDict[tuple, Image.Image]" = OrderedDict()
+_board_cache: "OrderedDict[Tuple[str, int, int], Image.Image]" = OrderedDict()
+BOARD_CACHE_MAX = 32
+
+
+def _position_colour(i: int) -> Tuple[int, int, int]:
+    # Top 3 coloring
+    if i == 0:
+        return (255, 215, 0)
+    if i == 1:
+        return (192, 192, 192)
+    if i == 2:
+        return (205, 127, 50)
+    return (173, 216, 230)
+
+
+@lru_cache(maxsize=32)
+def _emblem(rank_name: str) -> Optional["Image.Image"]:
+    emblem_path = f"assets/ranks/{rank_name.lower().replace(' ', '_')}.png"
+    try:
+        return Image.open(emblem_path).convert("RGBA").resize((28, 28))
+    except Exception:
+        return None
+
+
+def _board_background(stat: str, width: int, height: int) -> "Image.Image":
+    key = (stat, width, height)
+    board = _board_cache.get(key)
+    if board is None:
+        board = Image.new("RGBA", (width, height), LB_BG)
+        draw = ImageDraw.Draw(board)
+        title_font, title = fit_text(f"{stat.capitalize()} Leaderboard", width - 40, "sans-bold", 36)
+        draw.text((width // 2, 30), title, font=title_font, anchor="ms", fill=(255, 255, 255))
+        _board_cache[key] = board
+        while len(_board_cache) > BOARD_CACHE_MAX:
+            _board_cache.popitem(last=False)
+    else:
+        _board_cache.move_to_end(key)
+    return board.copy()
+
+
+def _tile_key(stat: str, e: dict, colour, number_w: int) -> tuple:
+    # The avatar URL carries the avatar hash, so a new avatar is a new tile
+    return (e.get('id'), e['display_name'], e['avatar_url'], e['rank'], str(e['value']),
+            stat == 'rank', colour, number_w)
+
+
+def _render_tile(stat: str, e: dict, avatar_final, colour, number_w: int) -> "Image.Image":
+    tile = Image.new("RGBA", (LB_COL_W, LB_ROW_H), LB_BG)
+    draw = ImageDraw.Draw(tile)
+
+    if avatar_final is None:
+        avatar_final = Image.new("RGBA", (40, 40), (100, 100, 100, 255))
+    tile.paste(avatar_final, (0, 8), avatar_final)
+
+    name_x = 54
+    emblem = _emblem(normalize_rank_name(e['rank']))
+    emblem_x = name_x + (180 if stat == 'rank' else 200)
+    value_x = emblem_x + 40 if emblem else emblem_x
+    value_end = LB_COL_W - 10
+
+    name_font, name_text = fit_text(str(e['display_name']), emblem_x - name_x - number_w - 8, "sans", LB_FONT_SIZE, 13)
+    draw.text((name_x + number_w, 14), name_text, font=name_font, fill=colour)
+
+    if emblem:
+        tile.paste(emblem, (emblem_x, 10), emblem)
+    value_font, value_text = fit_text(str(e['value']), value_end - value_x, "sans", LB_FONT_SIZE)
+    draw.text((value_x, 14), value_text, font=value_font, fill=(255, 255, 255))
+    return tile
+
+
+def _cached_tile(key: tuple) -> Optional["Image.Image"]:
+    tile = _tile_cache.get(key)
+    if tile is not None:
+        _tile_cache.move_to_end(key)
+        return tile
+    stored = cache_snapshot.lookup("tiles", key)
+    if stored is None:
+        return None
+    try:
+        tile = _tile_cache[key] = decode_image(*stored)
+    except Exception:
+        return None
+    return tile
+
+
+def _export_images(cache: "OrderedDict"):
+    def export():
+        for key, image in reversed(list(cache.items())):
+            yield key, image_meta(image), image
+    return export
+
+
+cache_snapshot.register("avatars", _export_images(_avatar_cache), encode_image, max_entries=AVATAR_CACHE_MAX)
+cache_snapshot.register("tiles", _export_images(_tile_cache), encode_image, max_entries=TILE_CACHE_MAX)
+
+
+# rows: dicts with display_name, avatar_url, rank and value (and the user's
+# id when known, to keep tiles of same-named players apart), already sorted
+async def render_leaderboard(stat: str, rows: List[dict]) -> BytesIO:
+    _require_pil()
+
+    cols = (len(rows) + LB_ROWS_PER_COL - 1) // LB_ROWS_PER_COL
+    # Columns start 20px in, so the last one needs the extra margin
+    width = max(600, 20 + cols * LB_COL_W)
+    height = LB_HEADER_H + LB_ROWS_PER_COL * LB_ROW_H
+
+    number_font = get_font("sans", LB_FONT_SIZE)
+    number_w = int(text_width(f"{len(rows)}.", "sans", LB_FONT_SIZE)) + 6
+
+    keys = [_tile_key(stat, e, _position_colour(i), number_w) for i, e in enumerate(rows)]
+    # This board's tiles, taken before the avatar fetch: a render running
+    # meanwhile may trim them out of _tile_cache
+    tiles = {}
+    missing = []
+    for i, key in enumerate(keys):
+        tile = _cached_tile(key)
+        if tile is None:
+            missing.append(i)
+        else:
+            tiles[key] = tile
+
+    if missing:
+        if aiohttp is not None:
+            async with aiohttp.ClientSession() as session:
+                avatars = await asyncio.gather(
+                    *(get_circular_avatar(rows[i]['avatar_url'], 40, 2, session) for i in missing)
+                )
+        else:
+            avatars = [None] * len(missing)
+        for i, avatar_final in zip(missing, avatars):
+            tiles[keys[i]] = _tile_cache[keys[i]] = _render_tile(stat, rows[i], avatar_final, _position_colour(i), number_w)
+
+    img = _board_background(stat, width, height)
+    draw = ImageDraw.Draw(img)
+    for i, key in enumerate(keys):
+        x = 20 + (i // LB_ROWS_PER_COL) * LB_COL_W
+        y = LB_HEADER_H + (i % LB_ROWS_PER_COL) * LB_ROW_H
+        img.paste(tiles[key], (x, y))
+        draw.text((x + 54, y + 14), f"{i + 1}.", font=number_font, fill=_position_colour(i))
+
+    size = sum(tile.width * tile.height * 4 for tile in _tile_cache.values())
+    while size > TILE_CACHE_MAX_BYTES:
+        _, tile = _tile_cache.popitem(last=False)
+        size -= tile.width * tile.height * 4
+
+    out = BytesIO()
+    img.save(out, format='PNG')
+    out.seek(0)
+    return out
+
+
+def warm_up():
+    _require_pil()
+    for family in FONT_FAMILIES:
+        _font_path(family)
@@ -0,0 +1,8 @@
+RANK_PRIORITY = {"Elite": 1, "Master": 2, "Diamond": 3, "Platinum": 4, "Gold": 5, "Silver": 6, "Bronze": 7}
+
+
+def normalize_rank_name(rank: str) -> str:
+    # Convert to known rank string that matches asset filenames
+    if not rank:
+        return "bronze"
+    return rank.strip().title()
@@ -0,0 +1,190 @@
+import os
+import hmac
+import json
+import time
+import asyncio
+import itertools
+from typing import Dict, Optional, Tuple
+
+from .scraper import ProfileNotFoundError
+
+# --- Scrape job queue ---
+# The bot listens on SCRAPER_ADDRESS and scraper workers (python -m
+# rematch_bot.worker) connect to it. Each connection runs one job at a time:
+# the worker first sends a hello line with the shared SCRAPER_TOKEN, then the
+# dispatcher writes a job line and the worker answers with a result line.
+#
+#   hello:  {"token": "..."}
+#   job:    {"id": 1, "platform": "steam", "player_id": "...", "ranked": false}
+#   result: {"id": 1, "ok": true, "profile": {...}}
+#           {"id": 1, "ok": false, "error": "...", "not_found": true}
+#
+# A worker that disconnects or overruns JOB_TIMEOUT mid-job has its
+# connection dropped and the job goes back on the queue (up to MAX_ATTEMPTS).
+#
+# Anyone who can connect can feed the bot profiles, so a TCP listener on
+# anything but a loopback address needs SCRAPER_TOKEN set.
+
+DEFAULT_ADDRESS = "unix:/tmp/rematch-scraper.sock"
+JOB_TIMEOUT = float(os.getenv("SCRAPER_JOB_TIMEOUT", "60"))
+QUEUE_TIMEOUT = float(os.getenv("SCRAPER_QUEUE_TIMEOUT", "120"))
+MAX_ATTEMPTS = 2
+TOKEN = os.getenv("SCRAPER_TOKEN", "")
+HELLO_TIMEOUT = 10.0
+LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")
+# Browser metrics from workers that haven't answered for this long are dropped
+WORKER_METRICS_MAX_AGE = 600
+
+
+class ScrapeError(RuntimeError):
+    pass
+
+
+def parse_address(address: str) -> Tuple[str, str, int]:
+    # "unix:/path/to.sock" or "tcp:host:port"
+    kind, _, rest = address.partition(":")
+    if kind == "unix" and rest:
+        return "unix", rest, 0
+    if kind == "tcp":
+        host, _, port = rest.rpartition(":")
+        if host and port.isdigit():
+            return "tcp", host, int(port)
+    raise ValueError(f"Invalid scraper address {address!r}; use unix:/path or tcp:host:port")
+
+
+async def open_connection(address: str):
+    kind, host, port = parse_address(address)
+    if kind == "unix":
+        return await asyncio.open_unix_connection(host)
+    return await asyncio.open_connection(host, port)
+
+
+class ScrapeDispatcher:
+    def __init__(self, address: str = DEFAULT_ADDRESS, job_timeout: float = JOB_TIMEOUT,
+                 queue_timeout: float = QUEUE_TIMEOUT, token: str = TOKEN):
+        self.address = address
+        self.token = token
+        self.job_timeout = job_timeout
+        self.queue_timeout = queue_timeout
+        self._queue: "asyncio.Queue[Tuple[dict, asyncio.Future, int]]" = asyncio.Queue()
+        self._ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.workers = 0
+        self.completed = 0
+        self.failed = 0
+        # worker pid -> (monotonic time, browser metrics) from its last result
+        self._worker_browsers: Dict[int, Tuple[float, dict]] = {}
+
+    async def start(self):
+        kind, host, port = parse_address(self.address)
+        if kind == "unix":
+            try:
+                os.unlink(host)
+            except FileNotFoundError:
+                pass
+            self._server = await asyncio.start_unix_server(self._handle_worker, host)
+        else:
+            if host not in LOOPBACK_HOSTS and not self.token:
+                raise ScrapeError(f"Set SCRAPER_TOKEN to listen on {self.address}; "
+                                  f"without it only loopback addresses are allowed")
+            self._server = await asyncio.start_server(self._handle_worker, host, port)
+        print(f"Scrape queue listening on {self.address}")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def worker_browsers(self) -> Dict[int, dict]:
+        cutoff = time.monotonic() - WORKER_METRICS_MAX_AGE
+        for pid in [pid for pid, (seen, _) in self._worker_browsers.items() if seen < cutoff]:
+            del self._worker_browsers[pid]
+        return {pid: metrics for pid, (_, metrics) in self._worker_browsers.items()}
+
+    async def submit(self, platform: str, player_id: str, ranked: bool = False) -> dict:
+        job = {"id": next(self._ids), "platform": platform, "player_id": player_id, "ranked": ranked}
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((job, fut, 0))
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), self.queue_timeout)
+        except asyncio.TimeoutError:
+            fut.cancel()
+            if self.workers == 0:
+                raise ScrapeError("No scraper workers are connected") from None
+            raise ScrapeError("Timed out waiting for a scraper worker") from None
+
+    def _requeue(self, job: dict, fut: asyncio.Future, attempts: int, reason: str):
+        if fut.done():
+            return
+        if attempts + 1 < MAX_ATTEMPTS:
+            self._queue.put_nowait((job, fut, attempts + 1))
+        else:
+            self.failed += 1
+            fut.set_exception(ScrapeError(reason))
+
+    async def _hello(self, reader: asyncio.StreamReader) -> bool:
+        try:
+            hello = json.loads(await asyncio.wait_for(reader.readline(), HELLO_TIMEOUT))
+            token = hello.get("token") or ""
+        except (asyncio.TimeoutError, ConnectionError, OSError, ValueError, AttributeError):
+            return False
+        return hmac.compare_digest(token.encode(), self.token.encode())
+
+    async def _handle_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if not await self._hello(reader):
+            print(f"⚠️ Scrape queue: rejected a worker from {writer.get_extra_info('peername') or 'a local socket'}")
+            writer.close()
+            return
+        self.workers += 1
+        try:
+            while True:
+                # Watch for the worker going away while idle so dead
+                # connections don't pick up (and burn attempts on) new jobs
+                get_task = asyncio.ensure_future(self._queue.get())
+                eof_task = asyncio.ensure_future(reader.read(1))
+                await asyncio.wait({get_task, eof_task}, return_when=asyncio.FIRST_COMPLETED)
+                if not get_task.done():
+                    get_task.cancel()
+                    return
+                eof_task.cancel()
+                job, fut, attempts = get_task.result()
+                if fut.done():
+                    # The caller gave up while the job was queued
+                    continue
+                try:
+                    writer.write((json.dumps(job) + "\n").encode())
+                    await writer.drain()
+                    line = await asyncio.wait_for(reader.readline(), self.job_timeout)
+                    if not line:
+                        raise ConnectionError("worker disconnected")
+                    result = json.loads(line)
+                except asyncio.TimeoutError:
+                    self._requeue(job, fut, attempts, "Scraper worker timed out")
+                    return
+                except (ConnectionError, OSError, ValueError) as e:
+                    self._requeue(job, fut, attempts, f"Scraper worker failed: {e}")
+                    return
+
+                browsers = result.get("browsers")
+                if isinstance(browsers, dict) and "pid" in browsers:
+                    self._worker_browsers[browsers["pid"]] = (time.monotonic(), browsers)
+
+                if fut.done():
+                    continue
+                if result.get("ok"):
+                    self.completed += 1
+                    fut.set_result(result["profile"])
+                elif result.get("not_found"):
+                    self.completed += 1
+                    fut.set_exception(ProfileNotFoundError(result.get("error") or "profile not found"))
+                else:
+                    self.failed += 1
+                    fut.set_exception(ScrapeError(result.get("error") or "scrape failed"))
+        finally:
+            self.workers -= 1
+            writer.close()
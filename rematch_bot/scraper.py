@@ -0,0 +1,376 @@
+import re
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Type
+from urllib.parse import urlsplit
+
+from . import config
+from .browsers import browser_governor
+from .circuit import CircuitBreaker, CircuitOpenError
+from .snapshot import cache_snapshot, decode_json, encode_json
+
+PROFILE_URL = config.REMATCHTRACKER_URL + "/player/{platform}/{player_id}"
+
+# Mode dropdown on the profile page; four ArrowDowns land on "Ranked"
+MODE_DROPDOWN_SELECTOR = "div.flex.flex-col.sm\\:flex-row.justify-between.items-start.sm\\:items-center.gap-4.mb-6.svelte-kej2cd div"
+
+# field -> (selector, index of the match to read)
+STAT_SELECTORS = {
+    "wins": ("div.text-lg.font-bold.text-green-400.svelte-kej2cd", 0),
+    "losses": ("div.text-lg.font-bold.text-red-400.svelte-kej2cd", 0),
+    "goals": ("span.font-bold.text-purple-400.svelte-kej2cd", 0),
+    "passes": ("span.font-bold.text-blue-400.svelte-kej2cd", 1),
+    "steals": ("span.font-bold.text-pink-400.svelte-kej2cd", 0),
+    "saves": ("span.font-bold.text-red-400.svelte-kej2cd", 0),
+    "assists": ("span.font-bold.text-orange-400.svelte-kej2cd", 0),
+}
+NAME_SELECTOR = "h1"
+RANK_SELECTOR = "div.text-lg.font-bold.text-white"
+
+# --- Profile URLs ---
+# https://www.rematchtracker.com/player/<platform>/<player_id>; ids are kept
+# exactly as they appear in the URL path (still percent-encoded).
+PROFILE_HOSTS = {"rematchtracker.com", "www.rematchtracker.com", urlsplit(config.REMATCHTRACKER_URL).netloc.lower()}
+PLATFORM_ID_PATTERNS = {
+    "steam": re.compile(r"^\d{17}$"),  # SteamID64
+    "psn": re.compile(r"^[A-Za-z0-9_-]{3,16}$"),
+    "xbox": re.compile(r"^[A-Za-z0-9%]{1,64}$"),  # gamertags may carry encoded spaces / "#"
+}
+KNOWN_PLATFORMS = frozenset(PLATFORM_ID_PATTERNS)
+
+
+class ProfileNotFoundError(RuntimeError):
+    pass
+
+
+def validate_profile_ref(platform: str, player_id: str) -> Tuple[str, str]:
+    platform = platform.strip().lower()
+    player_id = player_id.strip()
+    if platform not in KNOWN_PLATFORMS:
+        raise ValueError(f"unknown platform {platform!r} (expected one of: {', '.join(sorted(KNOWN_PLATFORMS))})")
+    if not PLATFORM_ID_PATTERNS[platform].match(player_id):
+        raise ValueError(f"invalid {platform} player id {player_id!r}")
+    return platform, player_id
+
+
+def parse_profile_url(url: str) -> Tuple[str, str]:
+    # Strict: a rematchtracker host and a path of exactly /player/<platform>/<id>
+    url = url.strip().strip("<>")
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or parts.netloc.lower() not in PROFILE_HOSTS:
+        raise ValueError("not a rematchtracker.com link")
+    segments = parts.path.strip("/").split("/")
+    if len(segments) != 3 or segments[0] != "player":
+        raise ValueError("expected a profile link like https://www.rematchtracker.com/player/steam/76561198000000000")
+    return validate_profile_ref(segments[1], segments[2])
+
+
+# bs4 is only needed once the first page comes back; keep it off the import path
+_BeautifulSoup = None
+
+
+def load_parser():
+    global _BeautifulSoup
+    if _BeautifulSoup is None:
+        from bs4 import BeautifulSoup
+        _BeautifulSoup = BeautifulSoup
+    return _BeautifulSoup
+
+
+# features: the BeautifulSoup tree builder; benchmarks/bench_parser.py
+# compares the installed ones
+def parse_profile(html: str, features: str = 'html.parser') -> dict:
+    soup = load_parser()(html, features)
+
+    def get_stat(selector, index=0):
+        els = soup.select(selector)
+        if els and len(els) > index:
+            return els[index].get_text(strip=True)
+        return "N/A"
+
+    name_tag = soup.select_one(NAME_SELECTOR)
+    rank_tag = soup.select_one(RANK_SELECTOR)
+    profile = {
+        "name": name_tag.get_text(strip=True) if name_tag else "Unknown",
+        "rank": rank_tag.get_text(strip=True) if rank_tag else "N/A",
+    }
+    for field, (selector, index) in STAT_SELECTORS.items():
+        profile[field] = get_stat(selector, index)
+    return profile
+
+
+# --- Playwright-based scraping helpers (import locally inside functions) ---
+async def _fetch_html(platform: str, player_id: str, ranked: bool = False) -> str:
+    try:
+        from playwright.async_api import async_playwright
+    except Exception as e:
+        raise RuntimeError("Playwright is not available in this environment") from e
+
+    url = PROFILE_URL.format(platform=platform, player_id=player_id)
+
+    async with async_playwright() as p:
+        # The governor closes (or kills) the browser however the scrape ends
+        async with browser_governor.launch(p) as browser:
+            context = await browser.new_context()
+            page = await context.new_page()
+            # Bounded waits instead of Playwright's 30s defaults
+            response = await page.goto(url, timeout=config.SCRAPE_TIMEOUT * 1000)
+            if response is not None and response.status == 404:
+                raise ProfileNotFoundError(f"No rematchtracker profile for {platform}/{player_id}")
+            await page.wait_for_selector("h1", timeout=config.SCRAPE_TIMEOUT * 1000)
+
+            # Ranked-mode stats live behind the mode dropdown on the same page
+            if ranked:
+                try:
+                    await page.click(MODE_DROPDOWN_SELECTOR)
+                    for _ in range(4):
+                        await page.keyboard.press("ArrowDown")
+                    await page.keyboard.press("Enter")
+                    await page.wait_for_timeout(2000)
+                except Exception:
+                    pass
+
+            html = await page.content()
+    return html
+
+
+# Scrapes in this process; scraper workers call this directly
+async def scrape_profile(platform: str, player_id: str, ranked: bool = False) -> dict:
+    profile = parse_profile(await _fetch_html(platform, player_id, ranked))
+    if profile["name"] == "Unknown" and all(profile[field] == "N/A" for field in STAT_SELECTORS):
+        raise ProfileNotFoundError(f"No rematchtracker profile for {platform}/{player_id}")
+    return profile
+
+
+# When the bot runs with out-of-process workers (SCRAPER_ADDRESS), scrapes go
+# through the job queue instead of launching Chromium next to the gateway.
+_dispatcher = None
+
+
+def set_dispatcher(dispatcher):
+    global _dispatcher
+    _dispatcher = dispatcher
+
+
+async def _scrape(platform: str, player_id: str, ranked: bool) -> dict:
+    if _dispatcher is not None:
+        return await _dispatcher.submit(platform, player_id, ranked)
+    return await scrape_profile(platform, player_id, ranked)
+
+
+# --- Profile cache ---
+# Scraped profiles are kept per (platform, player_id, ranked). Entries
+# younger than PROFILE_CACHE_TTL are served without scraping; older ones are
+# kept (up to PROFILE_STALE_MAX) as the fallback when scraping fails.
+PROFILE_STALE_MAX = 7 * 24 * 3600
+PROFILE_CACHE_MAX = 10000
+
+ProfileKey = Tuple[str, str, bool]
+
+
+class ProfileCache:
+    def __init__(self, ttl: float = config.PROFILE_CACHE_TTL, max_entries: int = PROFILE_CACHE_MAX):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[ProfileKey, Tuple[dict, float]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: ProfileKey, max_age: Optional[float] = None) -> Optional[Tuple[dict, float]]:
+        hit = self._entries.get(key)
+        if hit is None:
+            stored = cache_snapshot.lookup("profiles", key)
+            if stored is None:
+                return None
+            meta, payload = stored
+            hit = (decode_json(payload), meta["t"])
+            self.put(key, *hit)
+        if time.time() - hit[1] > (self.ttl if max_age is None else max_age):
+            return None
+        self._entries.move_to_end(key)
+        return hit
+
+    def put(self, key: ProfileKey, profile: dict, fetched_at: Optional[float] = None):
+        self._entries[key] = (profile, time.time() if fetched_at is None else fetched_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def export(self):
+        # Most recently used first, for the cache snapshot
+        for key, (profile, fetched_at) in reversed(list(self._entries.items())):
+            yield key, {"t": fetched_at}, profile
+
+
+profile_cache = ProfileCache()
+cache_snapshot.register("profiles", profile_cache.export, encode_json,
+                        max_age=PROFILE_STALE_MAX, max_entries=PROFILE_CACHE_MAX)
+
+
+# --- Negative cache ---
+# Failed scrapes are remembered per (platform, player_id) so repeat lookups
+# fail fast without a browser: profiles that don't exist for
+# NEGATIVE_CACHE_TTL, other failures (while the site itself looks healthy)
+# for NEGATIVE_ERROR_TTL.
+NEGATIVE_ERROR_TTL = 60
+NEGATIVE_CACHE_MAX = 10000
+
+
+class NegativeCache:
+    def __init__(self, max_entries: int = NEGATIVE_CACHE_MAX):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Type[Exception], str, float]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Tuple[str, str]) -> Optional[Exception]:
+        hit = self._entries.get(key)
+        if hit is None:
+            stored = cache_snapshot.lookup("negative", key)
+            if stored is None:
+                return None
+            meta, payload = stored
+            not_found, message = decode_json(payload)
+            hit = self._entries[key] = (ProfileNotFoundError if not_found else RuntimeError, message, meta["exp"])
+        error_type, message, expires_at = hit
+        if time.time() >= expires_at:
+            del self._entries[key]
+            return None
+        return error_type(message)
+
+    def put(self, key: Tuple[str, str], error: Exception, ttl: float):
+        self._entries[key] = (type(error), str(error), time.time() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: Tuple[str, str]):
+        self._entries.pop(key, None)
+
+    def export(self):
+        for key, (error_type, message, expires_at) in reversed(list(self._entries.items())):
+            yield key, {"exp": expires_at}, [issubclass(error_type, ProfileNotFoundError), message]
+
+
+negative_cache = NegativeCache()
+cache_snapshot.register("negative", negative_cache.export, encode_json, max_entries=NEGATIVE_CACHE_MAX)
+
+
+# --- Circuit breaker ---
+# Scrapes go through a breaker so an outage fails fast (or falls back to a
+# cached profile) instead of queueing browsers behind page timeouts.
+# Recovery is probed with a plain HTTP request, never a browser.
+_last_success: Optional[Tuple[str, str]] = None
+
+
+async def _probe_site() -> bool:
+    import aiohttp
+
+    if _last_success is not None:
+        url = PROFILE_URL.format(platform=_last_success[0], player_id=_last_success[1])
+    else:
+        url = config.REMATCHTRACKER_URL
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=config.SCRAPE_TIMEOUT)) as resp:
+            return resp.status < 500
+
+
+# A missing profile is an answer from a healthy site, not a failure
+breaker = CircuitBreaker("rematchtracker", probe=_probe_site, slow_call_seconds=config.SCRAPE_TIMEOUT,
+                         ignore=(ProfileNotFoundError,))
+
+_inflight: Dict[ProfileKey, asyncio.Future] = {}
+
+
+async def _scrape_guarded(key: ProfileKey) -> dict:
+    global _last_success
+    try:
+        profile = await breaker.call(_scrape, *key)
+    except ProfileNotFoundError as e:
+        negative_cache.put(key[:2], e, config.NEGATIVE_CACHE_TTL)
+        raise
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        if not breaker.is_open:
+            negative_cache.put(key[:2], e, NEGATIVE_ERROR_TTL)
+        raise
+    negative_cache.discard(key[:2])
+    profile_cache.put(key, profile)
+    _last_success = key[:2]
+    return profile
+
+
+async def _fetch(platform: str, player_id: str, ranked: bool) -> Tuple[dict, bool]:
+    # (profile, scraped): scraped is True only for the call that ran the
+    # scrape, so a profile is stored once however many callers shared it
+    key = (platform, player_id, ranked)
+    hit = profile_cache.get(key)
+    if hit is not None:
+        return hit[0], False
+
+    try:
+        failure = negative_cache.get(key[:2])
+        if failure is not None:
+            raise failure
+
+        # Concurrent requests for the same profile share one scrape
+        fut = _inflight.get(key)
+        scraped = fut is None
+        if scraped:
+            fut = _inflight[key] = asyncio.ensure_future(_scrape_guarded(key))
+            fut.add_done_callback(lambda _: _inflight.pop(key, None))
+        return await asyncio.shield(fut), scraped
+    except ProfileNotFoundError:
+        raise
+    except Exception:
+        stale = profile_cache.get(key, PROFILE_STALE_MAX)
+        if stale is None:
+            raise
+        return stale_profile(*stale), False
+
+
+def stale_profile(profile: dict, fetched_at: float) -> dict:
+    # Marked copy; commands show "stale as of" and skip storing it
+    return dict(profile, stale_as_of=fetched_at)
+
+
+def peek_profile(platform: str, player_id: str, ranked: bool = False) -> Optional[dict]:
+    # What the cache holds for a profile, without scraping: as is while
+    # fresh, marked stale once older than the TTL
+    hit = profile_cache.get((platform, player_id, ranked), PROFILE_STALE_MAX)
+    if hit is None:
+        return None
+    profile, fetched_at = hit
+    if time.time() - fetched_at <= profile_cache.ttl:
+        return profile
+    return stale_profile(profile, fetched_at)
+
+
+async def fetch_profile(platform: str, player_id: str) -> dict:
+    return (await _fetch(platform, player_id, False))[0]
+
+
+async def fetch_profile_same_page(platform: str, player_id: str) -> dict:
+    return (await _fetch(platform, player_id, True))[0]
+
+
+async def fetch_profile_scraped(platform: str, player_id: str, ranked: bool = False) -> Tuple[dict, bool]:
+    # Also says whether this call scraped it; only a scrape has new stats
+    # to store, a cache hit was stored when it was scraped
+    return await _fetch(platform, player_id, ranked)
+
+
+def warm_up(playwright: bool = True):
+    # Pay the import cost off the event loop before the first command needs it
+    load_parser()
+    if playwright:
+        try:
+            import playwright.async_api  # noqa: F401
+        except Exception:
+            pass
@@ -0,0 +1,253 @@
+import os
+import json
+import mmap
+import time
+import struct
+import sys
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from . import config
+
+# --- Cache snapshot ---
+# In-memory caches (scraped profiles, resolved users, avatars, leaderboard
+# tiles) are written to one binary file on shutdown and every
+# CACHE_SNAPSHOT_MINUTES, and read back after a restart.
+#
+# Reading is lazy: the file is memory-mapped on the first lookup and only
+# the record headers are scanned; a payload is decoded when its cache misses
+# on that key, then lives in the cache as usual. Records carry their age
+# ("t") and/or expiry ("exp") so TTLs still apply across restarts.
+#
+#   file:    b"RMTCACHE" | u32 version | u32 sections
+#   section: u16 name length | name | u32 records
+#   record:  u32 key length | key (JSON) | u32 meta length | meta (JSON) |
+#            u32 payload length | payload
+
+MAGIC = b"RMTCACHE"
+VERSION = 1
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+
+class Record(NamedTuple):
+    meta: dict
+    start: int
+    end: int
+
+
+class Section(NamedTuple):
+    export: Callable[[], Iterable[Tuple[Any, dict, Any]]]
+    encode: Callable[[Any], bytes]
+    max_age: Optional[float]
+    max_entries: int
+
+
+def snapshot_key(key) -> str:
+    # Tuples and lists serialize alike, so runtime keys match stored ones
+    return json.dumps(key, separators=(",", ":"))
+
+
+class SnapshotFile:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.sections = self._index()
+        except Exception:
+            self._file.close()
+            raise
+
+    def _index(self) -> Dict[str, Dict[str, Record]]:
+        data = self._map
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("not a cache snapshot")
+        pos = len(MAGIC)
+        version, = _U32.unpack_from(data, pos)
+        if version != VERSION:
+            raise ValueError(f"unsupported snapshot version {version}")
+        section_count, = _U32.unpack_from(data, pos + 4)
+        pos += 8
+        sections = {}
+        for _ in range(section_count):
+            name_len, = _U16.unpack_from(data, pos)
+            name = data[pos + 2:pos + 2 + name_len].decode()
+            record_count, = _U32.unpack_from(data, pos + 2 + name_len)
+            pos += 2 + name_len + 4
+            records = sections[name] = {}
+            for _ in range(record_count):
+                key_len, = _U32.unpack_from(data, pos)
+                key = data[pos + 4:pos + 4 + key_len].decode()
+                pos += 4 + key_len
+                meta_len, = _U32.unpack_from(data, pos)
+                meta = json.loads(data[pos + 4:pos + 4 + meta_len])
+                pos += 4 + meta_len
+                payload_len, = _U32.unpack_from(data, pos)
+                records[key] = Record(meta, pos + 4, pos + 4 + payload_len)
+                pos += 4 + payload_len
+        return sections
+
+    def payload(self, record: Record) -> bytes:
+        return self._map[record.start:record.end]
+
+    def close(self):
+        try:
+            self._map.close()
+        finally:
+            self._file.close()
+
+
+def _expired(meta: dict, max_age: Optional[float], now: float) -> bool:
+    if "exp" in meta and meta["exp"] <= now:
+        return True
+    return max_age is not None and "t" in meta and now - meta["t"] > max_age
+
+
+def _write(tmp: str, sections: List[Tuple[str, List[Tuple[str, dict, bytes]]]]):
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + _U32.pack(VERSION) + _U32.pack(len(sections)))
+        for name, records in sections:
+            encoded_name = name.encode()
+            f.write(_U16.pack(len(encoded_name)) + encoded_name + _U32.pack(len(records)))
+            for key, meta, payload in records:
+                key_bytes = key.encode()
+                meta_bytes = json.dumps(meta, separators=(",", ":")).encode()
+                f.write(_U32.pack(len(key_bytes)) + key_bytes)
+                f.write(_U32.pack(len(meta_bytes)) + meta_bytes)
+                f.write(_U32.pack(len(payload)))
+                f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class CacheSnapshot:
+    def __init__(self, path: str = config.CACHE_SNAPSHOT_PATH):
+        self.path = path
+        self._sections: Dict[str, Section] = {}
+        self._file: Optional[SnapshotFile] = None
+        self._opened = False
+        # Saves run in a worker thread and swap the file under lookups
+        self._lock = threading.Lock()
+
+    def register(self, name: str, export: Callable[[], Iterable[Tuple[Any, dict, Any]]],
+                 encode: Callable[[Any], bytes], max_age: Optional[float] = None, max_entries: int = 10000):
+        # export() yields (key, meta, value) for what is in memory right now;
+        # encode(value) runs later, possibly in a worker thread
+        self._sections[name] = Section(export, encode, max_age, max_entries)
+
+    def _open(self) -> Optional[SnapshotFile]:
+        if not self._opened:
+            self._opened = True
+            if self.path and os.path.exists(self.path):
+                try:
+                    t0 = time.perf_counter()
+                    self._file = SnapshotFile(self.path)
+                    count = sum(len(r) for r in self._file.sections.values())
+                    print(f"Cache snapshot: {count} records indexed in {(time.perf_counter() - t0) * 1000:.0f} ms", file=sys.stderr)
+                except Exception as e:
+                    print(f"⚠️ Ignoring cache snapshot {self.path}: {e}", file=sys.stderr)
+        return self._file
+
+    def lookup(self, name: str, key) -> Optional[Tuple[dict, bytes]]:
+        # Stored (meta, payload) for a key the in-memory cache missed
+        with self._lock:
+            snapshot = self._open()
+            if snapshot is None:
+                return None
+            record = snapshot.sections.get(name, {}).get(snapshot_key(key))
+            if record is None:
+                return None
+            section = self._sections.get(name)
+            if _expired(record.meta, section.max_age if section else None, time.time()):
+                return None
+            return record.meta, snapshot.payload(record)
+
+    def collect(self) -> List[Tuple[str, List[Tuple[str, dict, Any]], Optional[Section]]]:
+        # Cheap part of a save, run on the event loop: copy out what each
+        # cache holds. Values are encoded later by write_collected().
+        collected = []
+        for name, section in self._sections.items():
+            try:
+                collected.append((name, [(snapshot_key(k), meta, v) for k, meta, v in section.export()], section))
+            except Exception as e:
+                print(f"⚠️ Cache snapshot: skipping {name}: {e}", file=sys.stderr)
+        return collected
+
+    def write_collected(self, collected) -> int:
+        if not self.path:
+            return 0
+        now = time.time()
+        with self._lock:
+            previous = self._open()
+        sections = []
+        total = 0
+        for name, items, section in collected:
+            records = []
+            seen = set()
+            for key, meta, value in items:
+                if key in seen or _expired(meta, section.max_age, now):
+                    continue
+                try:
+                    records.append((key, meta, section.encode(value)))
+                except Exception:
+                    continue
+                seen.add(key)
+                if len(records) >= section.max_entries:
+                    break
+            # Keep what the last snapshot had and nobody asked for since
+            if previous is not None:
+                for key, record in previous.sections.get(name, {}).items():
+                    if len(records) >= section.max_entries:
+                        break
+                    if key not in seen and not _expired(record.meta, section.max_age, now):
+                        records.append((key, record.meta, previous.payload(record)))
+                        seen.add(key)
+            sections.append((name, records))
+            total += len(records)
+
+        tmp = self.path + ".tmp"
+        _write(tmp, sections)
+        with self._lock:
+            # The old map has to go before the file can be replaced (Windows);
+            # the next lookup maps the new one
+            self.close()
+            os.replace(tmp, self.path)
+            self._opened = False
+        return total
+
+    def save(self) -> int:
+        return self.write_collected(self.collect())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+cache_snapshot = CacheSnapshot()
+
+
+# --- Payload helpers ---
+
+def encode_json(value) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def decode_json(payload: bytes):
+    return json.loads(payload)
+
+
+def encode_image(image) -> bytes:
+    return zlib.compress(image.tobytes(), 1)
+
+
+def image_meta(image, **meta) -> dict:
+    return dict(meta, w=image.width, h=image.height, mode=image.mode)
+
+
+def decode_image(meta: dict, payload: bytes):
+    from PIL import Image
+
+    return Image.frombytes(meta["mode"], (meta["w"], meta["h"]), zlib.decompress(payload))
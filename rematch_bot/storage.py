@@ -0,0 +1,554 @@
+import os
+import json
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+# aiosqlite is optional; the JSON backend needs nothing beyond the stdlib
+try:
+    import aiosqlite  # type: ignore
+except Exception:
+    aiosqlite = None
+
+# Paths
+LINKED_DB_PATH = "linked_profiles.db"
+LINKED_JSON_PATH = "linked_profiles.json"
+LAST_STATS_PATH = "last_stats.json"
+STATS_HISTORY_PATH = "stats_history.json"
+
+# Stat snapshots kept per player
+HISTORY_LIMIT = 50
+
+Link = Tuple[str, str, str]
+Derive = Callable[[Optional[dict], dict], None]
+
+
+# --- Storage interface ---
+# Links map a Discord user to a rematchtracker platform/player_id, stats hold
+# the last scraped entry per user and history keeps the most recent entries.
+class Storage(ABC):
+    name = "base"
+
+    async def init(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def close_sync(self):
+        pass
+
+    @abstractmethod
+    async def replace_link(self, discord_id: str, platform: str, player_id: str): ...
+
+    @abstractmethod
+    async def replace_links(self, rows: List[Link]): ...
+
+    @abstractmethod
+    async def get_link(self, discord_id: str) -> Optional[Tuple[str, str]]: ...
+
+    @abstractmethod
+    async def delete_link(self, discord_id: str) -> bool: ...
+
+    @abstractmethod
+    async def list_links(self) -> List[Link]: ...
+
+    @abstractmethod
+    def iter_links(self, batch_size: int = 1000) -> AsyncIterator[List[Link]]: ...
+
+    @abstractmethod
+    async def clear_links(self): ...
+
+    @abstractmethod
+    async def get_stats(self, discord_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_all_stats(self) -> Dict[str, dict]: ...
+
+    # Returns the entry it replaced (None for a first update) and records the
+    # new one in the player's history. derive(previous, entry), if given, adds
+    # fields computed from the replaced entry (read once) before the write.
+    @abstractmethod
+    async def update_stats(self, discord_id: str, entry: dict,
+                           derive: Optional[Derive] = None) -> Optional[dict]: ...
+
+    # Newest first
+    @abstractmethod
+    async def get_history(self, discord_id: str, limit: int = HISTORY_LIMIT) -> List[dict]: ...
+
+
+# --- SQLite backend ---
+class SQLiteStorage(Storage):
+    name = "sqlite"
+
+    def __init__(self, path: str = LINKED_DB_PATH, history_limit: int = HISTORY_LIMIT,
+                 legacy_stats_path: Optional[str] = LAST_STATS_PATH):
+        if aiosqlite is None:
+            raise RuntimeError("aiosqlite is required for the SQLite storage backend")
+        self.path = path
+        self.history_limit = history_limit
+        self.legacy_stats_path = legacy_stats_path
+        self._db = None
+
+    async def init(self):
+        if self._db is not None:
+            return
+        # One long-lived connection; aiosqlite serialises calls on its own thread
+        self._db = await aiosqlite.connect(self.path)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        # Shard-range processes share this file; wait on their locks instead of failing
+        await self._db.execute("PRAGMA busy_timeout=5000")
+        await self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS linked_profiles (
+                discord_id TEXT PRIMARY KEY,
+                platform TEXT NOT NULL,
+                player_id TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS last_stats (
+                discord_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS stats_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                discord_id TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS stats_history_user ON stats_history (discord_id, id);
+            """
+        )
+        await self._db.commit()
+        await self._import_legacy_stats()
+
+    async def _import_legacy_stats(self):
+        # last_stats used to live in its own JSON file next to the DB
+        if not self.legacy_stats_path or not os.path.exists(self.legacy_stats_path):
+            return
+        async with self._db.execute("SELECT 1 FROM last_stats LIMIT 1") as cursor:
+            if await cursor.fetchone():
+                return
+        try:
+            _, legacy = read_snapshot(self.legacy_stats_path)
+        except Exception:
+            return
+        await self._db.executemany(
+            "INSERT OR IGNORE INTO last_stats (discord_id, data) VALUES (?, ?)",
+            [(k, json.dumps(v)) for k, v in legacy.items()],
+        )
+        await self._db.commit()
+
+    async def close(self):
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def replace_link(self, discord_id: str, platform: str, player_id: str):
+        await self._db.execute(
+            "REPLACE INTO linked_profiles (discord_id, platform, player_id) VALUES (?, ?, ?)",
+            (discord_id, platform, player_id),
+        )
+        await self._db.commit()
+
+    async def replace_links(self, rows: List[Link]):
+        # One transaction per batch; used by bulk imports
+        await self._db.executemany(
+            "REPLACE INTO linked_profiles (discord_id, platform, player_id) VALUES (?, ?, ?)",
+            rows,
+        )
+        await self._db.commit()
+
+    async def get_link(self, discord_id: str) -> Optional[Tuple[str, str]]:
+        async with self._db.execute("SELECT platform, player_id FROM linked_profiles WHERE discord_id = ?", (discord_id,)) as cursor:
+            row = await cursor.fetchone()
+            return tuple(row) if row else None
+
+    async def delete_link(self, discord_id: str) -> bool:
+        cursor = await self._db.execute("DELETE FROM linked_profiles WHERE discord_id = ?", (discord_id,))
+        await self._db.commit()
+        return cursor.rowcount > 0
+
+    async def list_links(self) -> List[Link]:
+        async with self._db.execute("SELECT discord_id, platform, player_id FROM linked_profiles") as cursor:
+            rows = await cursor.fetchall()
+            return [(r[0], r[1], r[2]) for r in rows]
+
+    async def iter_links(self, batch_size: int = 1000) -> AsyncIterator[List[Link]]:
+        async with self._db.execute("SELECT discord_id, platform, player_id FROM linked_profiles") as cursor:
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [(r[0], r[1], r[2]) for r in rows]
+
+    async def clear_links(self):
+        await self._db.execute("DELETE FROM linked_profiles")
+        await self._db.commit()
+
+    async def get_stats(self, discord_id: str) -> Optional[dict]:
+        async with self._db.execute("SELECT data FROM last_stats WHERE discord_id = ?", (discord_id,)) as cursor:
+            row = await cursor.fetchone()
+            return json.loads(row[0]) if row else None
+
+    async def get_all_stats(self) -> Dict[str, dict]:
+        async with self._db.execute("SELECT discord_id, data FROM last_stats") as cursor:
+            rows = await cursor.fetchall()
+            return {r[0]: json.loads(r[1]) for r in rows}
+
+    async def update_stats(self, discord_id: str, entry: dict,
+                           derive: Optional[Derive] = None) -> Optional[dict]:
+        previous = await self.get_stats(discord_id)
+        if derive is not None:
+            derive(previous, entry)
+        data = json.dumps(entry)
+        await self._db.execute("REPLACE INTO last_stats (discord_id, data) VALUES (?, ?)", (discord_id, data))
+        await self._db.execute("INSERT INTO stats_history (discord_id, data) VALUES (?, ?)", (discord_id, data))
+        await self._db.execute(
+            """
+            DELETE FROM stats_history WHERE discord_id = ? AND id <= (
+                SELECT id FROM stats_history WHERE discord_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?
+            )
+            """,
+            (discord_id, discord_id, self.history_limit),
+        )
+        await self._db.commit()
+        return previous
+
+    async def get_history(self, discord_id: str, limit: int = HISTORY_LIMIT) -> List[dict]:
+        async with self._db.execute(
+            "SELECT data FROM stats_history WHERE discord_id = ? ORDER BY id DESC LIMIT ?",
+            (discord_id, limit),
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [json.loads(r[0]) for r in rows]
+
+
+# --- JSON backend ---
+
+# Append-log JSON key/value file.
+#
+# The whole mapping lives in memory; every change is appended to
+# "<path>.log" as one JSON line and the log is folded back into the snapshot
+# at "<path>" once it grows past the live data. Writes are write-behind: they
+# update the index immediately and are flushed (one write + one fsync per
+# batch) by a background task shortly after.
+#
+# Crash safety: the snapshot is only ever replaced atomically and a torn
+# trailing log line is discarded on load. Replay isn't idempotent ("push"
+# appends), so each compaction starts a new log generation: the snapshot
+# records its generation and the log starts with a ["generation", n] line.
+# A log whose generation doesn't match the snapshot's (a crash between the
+# snapshot replace and the log truncate) is already folded in and skipped.
+#
+# Snapshot files are {"format": 2, "generation": n, "data": {...}}; older
+# ones are the bare mapping, with a header-less log, both generation 0.
+SNAPSHOT_FORMAT = 2
+
+
+def read_snapshot(path: str) -> Tuple[int, Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        obj = json.load(f)
+    if isinstance(obj, dict) and obj.get("format") == SNAPSHOT_FORMAT:
+        return obj["generation"], obj["data"]
+    return 0, obj
+
+
+class JSONLogStore:
+    def __init__(self, path: str, flush_interval: float = 0.05, compact_min_ops: int = 1000,
+                 list_limit: int = HISTORY_LIMIT):
+        self.path = path
+        self.log_path = path + ".log"
+        self.flush_interval = flush_interval
+        self.compact_min_ops = compact_min_ops
+        self.list_limit = list_limit
+
+        self._data: Dict[str, Any] = {}
+        self._loaded = False
+        self._load_future: Optional[asyncio.Future] = None
+        self._pending: List[str] = []
+        self._log_ops = 0
+        self._generation = 0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._io_lock: Optional[asyncio.Lock] = None
+
+    # --- loading ---
+
+    def _sync_load(self):
+        data: Dict[str, Any] = {}
+        generation = 0
+        try:
+            generation, data = read_snapshot(self.path)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            data = {}
+
+        log_ops = 0
+        log_generation = None
+        torn = False
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        torn = True
+                        break
+                    if log_generation is None:
+                        log_generation = 0
+                        if op[0] == "generation":
+                            log_generation = op[1]
+                            continue
+                    if log_generation != generation:
+                        break
+                    self._apply(data, op)
+                    log_ops += 1
+        except FileNotFoundError:
+            pass
+
+        self._data = data
+        self._generation = generation
+        self._log_ops = log_ops
+        self._loaded = True
+        # Never append after a torn line or to a log from another generation;
+        # fold what we have into a fresh snapshot and log
+        if torn or log_generation != generation or not os.path.exists(self.path):
+            self._sync_compact(self._snapshot())
+
+    async def load(self):
+        if self._loaded:
+            return
+        if self._load_future is None:
+            loop = asyncio.get_running_loop()
+            self._load_future = loop.run_in_executor(None, self._sync_load)
+        await self._load_future
+
+    def _apply(self, data: Dict[str, Any], op: list):
+        kind = op[0]
+        if kind == "set":
+            data[op[1]] = op[2]
+        elif kind == "push":
+            items = data.get(op[1])
+            if not isinstance(items, list):
+                items = data[op[1]] = []
+            items.append(op[2])
+            if len(items) > self.list_limit:
+                del items[:len(items) - self.list_limit]
+        elif kind == "del":
+            data.pop(op[1], None)
+        elif kind == "clear":
+            data.clear()
+
+    # --- persistence ---
+
+    def _snapshot(self) -> Dict[str, Any]:
+        # Values are replaced or appended to, never edited in place, so
+        # copying the lists is enough to serialise off the event loop
+        return {k: list(v) if isinstance(v, list) else v for k, v in self._data.items()}
+
+    def _sync_append(self, text: str):
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _sync_compact(self, snapshot: Dict[str, Any]):
+        # snapshot must be exactly the state the log on disk describes
+        generation = self._generation + 1
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"format": SNAPSHOT_FORMAT, "generation": generation, "data": snapshot}, f,
+                      separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        # A crash before this leaves the old log behind; its generation no
+        # longer matches, so it isn't replayed over the new snapshot
+        with open(self.log_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(["generation", generation]) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._generation = generation
+        self._log_ops = 0
+
+    def _record(self, op: list):
+        self._apply(self._data, op)
+        self._pending.append(json.dumps(op, separators=(",", ":")) + "\n")
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        # Keep draining: records that arrive mid-flush don't schedule their own task
+        while self._pending:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self, compact: bool = False):
+        if self._io_lock is None:
+            self._io_lock = asyncio.Lock()
+        async with self._io_lock:
+            if not self._pending and not compact:
+                return
+            lines, self._pending = self._pending, []
+            log_ops = self._log_ops + len(lines)
+            compact = compact or (log_ops >= self.compact_min_ops and log_ops > len(self._data))
+            # Taken together with the lines: records made while the append
+            # runs are applied to _data but only logged by the next flush,
+            # so a later snapshot would hold ops the new log repeats
+            snapshot = self._snapshot() if compact else None
+
+            loop = asyncio.get_running_loop()
+            if lines:
+                await loop.run_in_executor(None, self._sync_append, "".join(lines))
+                self._log_ops = log_ops
+            if snapshot is not None:
+                await loop.run_in_executor(None, self._sync_compact, snapshot)
+
+    async def compact(self):
+        await self.flush(compact=True)
+
+    def close_sync(self):
+        # Last-chance flush for interpreter shutdown (no event loop required)
+        if self._pending:
+            lines, self._pending = self._pending, []
+            self._sync_append("".join(lines))
+
+    async def close(self):
+        await self.flush()
+
+    # --- key/value API ---
+
+    async def get(self, key: str) -> Any:
+        await self.load()
+        return self._data.get(key)
+
+    async def items(self) -> Dict[str, Any]:
+        await self.load()
+        return dict(self._data)
+
+    async def set(self, key: str, value: Any):
+        await self.load()
+        self._record(["set", key, value])
+
+    async def push(self, key: str, value: Any):
+        await self.load()
+        self._record(["push", key, value])
+
+    async def delete(self, key: str) -> bool:
+        await self.load()
+        if key in self._data:
+            self._record(["del", key])
+            return True
+        return False
+
+    async def clear(self):
+        await self.load()
+        self._record(["clear"])
+
+
+# JSON fallback DB for linked_profiles; keeps its compact
+# ["set", discord_id, platform, player_id] log records.
+class JSONDB(JSONLogStore):
+    def _apply(self, data: Dict[str, Any], op: list):
+        if op[0] == "set" and len(op) == 4:
+            data[op[1]] = {"platform": op[2], "player_id": op[3]}
+        else:
+            super()._apply(data, op)
+
+    async def replace_link(self, discord_id: str, platform: str, player_id: str):
+        await self.load()
+        self._record(["set", discord_id, platform, player_id])
+
+    async def replace_links(self, rows: List[Link]):
+        await self.load()
+        for discord_id, platform, player_id in rows:
+            self._record(["set", discord_id, platform, player_id])
+
+    async def get_link(self, discord_id: str) -> Optional[Tuple[str, str]]:
+        v = await self.get(discord_id)
+        if v:
+            return v.get("platform"), v.get("player_id")
+        return None
+
+    async def delete_link(self, discord_id: str) -> bool:
+        return await self.delete(discord_id)
+
+    async def list_links(self) -> List[Link]:
+        await self.load()
+        return [(k, v["platform"], v["player_id"]) for k, v in self._data.items()]
+
+
+class JSONStorage(Storage):
+    name = "json"
+
+    def __init__(self, links_path: str = LINKED_JSON_PATH, stats_path: str = LAST_STATS_PATH,
+                 history_path: str = STATS_HISTORY_PATH, history_limit: int = HISTORY_LIMIT):
+        self.links = JSONDB(links_path)
+        self.stats = JSONLogStore(stats_path)
+        self.history = JSONLogStore(history_path, list_limit=history_limit)
+
+    async def init(self):
+        await asyncio.gather(self.links.load(), self.stats.load(), self.history.load())
+
+    async def close(self):
+        await asyncio.gather(self.links.close(), self.stats.close(), self.history.close())
+
+    def close_sync(self):
+        for store in (self.links, self.stats, self.history):
+            store.close_sync()
+
+    async def replace_link(self, discord_id: str, platform: str, player_id: str):
+        await self.links.replace_link(discord_id, platform, player_id)
+
+    async def replace_links(self, rows: List[Link]):
+        await self.links.replace_links(rows)
+
+    async def get_link(self, discord_id: str) -> Optional[Tuple[str, str]]:
+        return await self.links.get_link(discord_id)
+
+    async def delete_link(self, discord_id: str) -> bool:
+        return await self.links.delete_link(discord_id)
+
+    async def list_links(self) -> List[Link]:
+        return await self.links.list_links()
+
+    async def iter_links(self, batch_size: int = 1000) -> AsyncIterator[List[Link]]:
+        rows = await self.links.list_links()
+        for i in range(0, len(rows), batch_size):
+            yield rows[i:i + batch_size]
+
+    async def clear_links(self):
+        await self.links.clear()
+
+    async def get_stats(self, discord_id: str) -> Optional[dict]:
+        return await self.stats.get(discord_id)
+
+    async def get_all_stats(self) -> Dict[str, dict]:
+        return await self.stats.items()
+
+    async def update_stats(self, discord_id: str, entry: dict,
+                           derive: Optional[Derive] = None) -> Optional[dict]:
+        previous = await self.stats.get(discord_id)
+        if derive is not None:
+            derive(previous, entry)
+        await self.stats.set(discord_id, entry)
+        await self.history.push(discord_id, entry)
+        return previous
+
+    async def get_history(self, discord_id: str, limit: int = HISTORY_LIMIT) -> List[dict]:
+        items = await self.history.get(discord_id) or []
+        return list(reversed(items[-limit:]))
+
+
+STORAGE_BACKENDS = {
+    "sqlite": SQLiteStorage,
+    "json": JSONStorage,
+}
+
+
+def create_storage(backend: Optional[str] = None) -> Storage:
+    # STORAGE_BACKEND overrides the default of SQLite-when-available
+    backend = (backend or os.getenv("STORAGE_BACKEND") or ("sqlite" if aiosqlite is not None else "json")).lower()
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend {backend!r}; expected one of {', '.join(STORAGE_BACKENDS)}")
+    return STORAGE_BACKENDS[backend]()
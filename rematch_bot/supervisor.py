@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+RESTART_DELAY_MAX = 30.0
+
+# (label, argv, extra environment)
+ProcessSpec = Tuple[str, List[str], Optional[Dict[str, str]]]
+
+
+def supervise(specs: List[ProcessSpec]):
+    # Start every process and restart any that exit, backing off when one
+    # keeps dying shortly after start. Blocks until interrupted.
+    children: List[Optional[subprocess.Popen]] = [None] * len(specs)
+    started = [0.0] * len(specs)
+    delay = [1.0] * len(specs)
+    restart_at = [0.0] * len(specs)
+    try:
+        while True:
+            now = time.monotonic()
+            for i, (label, cmd, env) in enumerate(specs):
+                child = children[i]
+                if child is not None:
+                    if child.poll() is None:
+                        continue
+                    delay[i] = 1.0 if now - started[i] > 60 else min(delay[i] * 2, RESTART_DELAY_MAX)
+                    restart_at[i] = now + delay[i]
+                    children[i] = None
+                    print(f"{label} exited with {child.returncode}; restarting in {delay[i]:.0f}s", file=sys.stderr)
+                if now >= restart_at[i]:
+                    children[i] = subprocess.Popen(cmd, env={**os.environ, **(env or {})})
+                    started[i] = now
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for child in children:
+            if child is not None and child.poll() is None:
+                child.terminate()
@@ -0,0 +1,96 @@
+import sys
+import json
+import asyncio
+import argparse
+from typing import List
+
+from . import scraper
+from .browsers import browser_governor
+from .scrape_queue import DEFAULT_ADDRESS, JOB_TIMEOUT, TOKEN, open_connection
+from .supervisor import supervise
+
+# --- Scraper worker ---
+# python -m rematch_bot.worker --procs 4 [--address unix:/tmp/rematch-scraper.sock ...]
+#
+# The parent process only supervises: it starts --procs children and
+# restarts any that exit. Each child keeps --concurrency connections open to
+# the bot's scrape queue and runs one Playwright scrape per connection.
+
+RECONNECT_DELAY_MAX = 30.0
+
+
+async def _run_job(job: dict) -> dict:
+    try:
+        # Finish a little inside the dispatcher's timeout so it gets an answer
+        profile = await asyncio.wait_for(
+            scraper.scrape_profile(job["platform"], job["player_id"], ranked=bool(job.get("ranked"))),
+            max(1.0, JOB_TIMEOUT - 5),
+        )
+        return {"id": job["id"], "ok": True, "profile": profile}
+    except asyncio.TimeoutError:
+        return {"id": job["id"], "ok": False, "error": "Scrape timed out"}
+    except scraper.ProfileNotFoundError as e:
+        return {"id": job["id"], "ok": False, "error": str(e), "not_found": True}
+    except Exception as e:
+        return {"id": job["id"], "ok": False, "error": str(e) or type(e).__name__}
+
+
+async def _serve_connection(address: str):
+    reader, writer = await open_connection(address)
+    try:
+        writer.write((json.dumps({"token": TOKEN}) + "\n").encode())
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            result = await _run_job(json.loads(line))
+            # Lets the bot report browser counts and memory per worker
+            result["browsers"] = browser_governor.metrics()
+            writer.write((json.dumps(result) + "\n").encode())
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def _connection_loop(address: str):
+    delay = 1.0
+    while True:
+        try:
+            await _serve_connection(address)
+            delay = 1.0
+        except (ConnectionError, OSError) as e:
+            print(f"Scraper worker: cannot reach {address} ({e}); retrying in {delay:.0f}s", file=sys.stderr)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, RECONNECT_DELAY_MAX)
+
+
+async def run_worker(addresses: List[str], concurrency: int):
+    scraper.warm_up()
+    await asyncio.gather(*(_connection_loop(a) for a in addresses for _ in range(concurrency)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-process rematchtracker scraper workers")
+    parser.add_argument("--address", action="append",
+                        help="unix:/path or tcp:host:port of a bot scrape queue; repeat to serve several bot processes")
+    parser.add_argument("--procs", type=int, default=1, help="worker processes to run and keep alive")
+    parser.add_argument("--concurrency", type=int, default=1, help="concurrent scrapes per process")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    addresses = args.address or [DEFAULT_ADDRESS]
+    if args.child:
+        try:
+            asyncio.run(run_worker(addresses, args.concurrency))
+        except KeyboardInterrupt:
+            pass
+    else:
+        cmd = [sys.executable, "-m", "rematch_bot.worker", "--child", "--concurrency", str(args.concurrency)]
+        for address in addresses:
+            cmd += ["--address", address]
+        supervise([(f"Scraper worker {i}", cmd, None) for i in range(args.procs)])
+
+
+if __name__ == "__main__":
+    main()